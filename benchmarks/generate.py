@@ -0,0 +1,246 @@
+"""
+Generator of synthetic input files for the benchmarks.
+
+For a given number of rows, writes the files every tool reads, with the headers
+the tools project (and a few columns they do not read, like the real exports):
+- `collation/`: gvSession.xlsx, Manage Schedule.xlsx and Enrolment Summary.xlsx
+- `deep-comparison/`: two consecutive CDL files (`src/` is where the comparison runs from)
+- `verify/`: TMS.xlsx and FBS.xlsx
+- `bulk-booking/`: a bulk booking template (xlsx and csv) and the portal's error report
+
+Values follow the shape of the real exports: about 5 sessions per schedule, a
+few recurring venues written with their short forms, FBS purposes that are
+truncated course titles, and a small share of rows that differ, mismatch or
+are rejected. The same number of rows and seed always give the same files.
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# Excel sheets hold 1,048,576 rows, including the header
+MAX_ROWS = 1048575
+
+depts = ['Finance & Technology', 'Human Capital, Management & Leadership', 'Business Management',
+         'Services, Operations and Business Improvement', 'Other']
+session_venues = ['SMU LKCSB SR 2-1', 'SMU SOE SR 3-4', 'SCIS1 SR B1-1', 'SMU Connexion Lab', 'SOA CR 3-2',
+                  'YPHSL SR 2-2', 'Online', 'Marina Bay Sands', '-']
+booking_venues = ['LKCSB Seminar Room 2-1', 'SOE/SCIS2 Classroom 3-4', 'SCIS1 Seminar Room B1-1', 'SMUC Lab 1',
+                  'YPHSL Classroom 2-2', 'SOA Seminar Room 3-2', 'SMUA Room 1', 'Online Class']
+subjects = ['Data Analytics', 'Digital Transformation', 'Financial Modelling', 'Leadership', 'Negotiation',
+            'Supply Chain Management', 'Design Thinking', 'Cybersecurity', 'Business Writing', 'Project Management']
+levels = ['Foundations of', 'Advanced', 'Applied', 'Strategic', 'Executive Certificate in']
+start_times = np.array(['09:00 AM', '09:30 AM', '02:00 PM', '07:00 PM'])
+end_times = np.array(['12:30 PM', '05:00 PM', '06:00 PM', '10:00 PM'])
+
+
+def course_titles(rng, count):
+    """
+    Distinct, long course titles
+    """
+    level = rng.choice(levels, count)
+    subject = rng.choice(subjects, count)
+    return [f'{first} {second} for Professionals (Run {number})'
+            for number, (first, second) in enumerate(zip(level, subject), start=1)]
+
+
+def write_excel(frame, path):
+    with pd.ExcelWriter(path, engine='xlsxwriter', datetime_format='yyyy-mm-dd') as writer:
+        frame.to_excel(writer, index=False)
+
+
+def generate_collation(rng, rows, directory):
+    """
+    gvSession, Manage Schedule and Enrolment Summary exports with `rows` sessions
+    """
+    schedules = max(rows // 5, 3)
+    sch_no = np.arange(100000, 100000 + schedules)
+    start = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 180, schedules), unit='D')
+    end = start + pd.to_timedelta(rng.integers(0, 14, schedules), unit='D')
+    audience = rng.choice(['Public', 'Corporate', None], schedules, p=[0.6, 0.3, 0.1])
+
+    write_excel(pd.DataFrame({
+        'Course Type': rng.choice(['Normal', 'Workshop', 'Assessment'], schedules, p=[0.6, 0.3, 0.1]),
+        'Sch #': sch_no,
+        'Schedule Audience': audience,
+        'Client Name': np.where(audience == 'Corporate', rng.choice(['ACME Pte Ltd', 'Globex', None], schedules), None),
+        'Course RunID': [f'CRS-{number}' for number in sch_no],
+        'Course Title': course_titles(rng, schedules),
+        'Sch S-Date': start,
+        'Sch E-Date': end,
+        'Sch Status': rng.choice(['Open', 'Confirmed', 'Cancelled'], schedules, p=[0.5, 0.4, 0.1]),
+        'Enr Pax': rng.integers(0, 40, schedules),
+        'Created By': 'benchmark',
+    }), os.path.join(directory, 'Manage Schedule.xlsx'))
+
+    enrolled = rng.random(schedules) < 0.7
+    write_excel(pd.DataFrame({
+        'Schedule #': sch_no[enrolled],
+        '# Registered': rng.integers(0, 30, enrolled.sum()),
+        'Course Title': 'benchmark',
+    }), os.path.join(directory, 'Enrolment Summary.xlsx'))
+
+    schedule = rng.integers(0, schedules, rows)
+    is_assessment = rng.random(rows) < 0.15
+    related = np.where(is_assessment, sch_no[rng.integers(0, schedules, rows)], np.nan)
+    session_date = start[schedule] + pd.to_timedelta(rng.integers(0, 14, rows), unit='D')
+    time_slot = rng.integers(0, len(start_times), rows)
+
+    write_excel(pd.DataFrame({
+        'Dept': rng.choice(depts, rows),
+        'Course Type': np.where(is_assessment, 'Assessment', rng.choice(['Normal', 'Workshop'], rows)),
+        'Sch #': sch_no[schedule],
+        'Related Schedule #': related,
+        'Session #': rng.integers(1, 10, rows),
+        'Session Date': session_date,
+        'Session Day': session_date.strftime('%a'),
+        'S-Time': start_times[time_slot],
+        'E-Time': end_times[time_slot],
+        'Venue': rng.choice(session_venues, rows),
+        'Lecturer': [f'Lecturer {number}' for number in rng.integers(1, 200, rows)],
+        'Remarks': '-',
+    }), os.path.join(directory, 'gvSession.xlsx'))
+
+
+def generate_cdl(rng, rows, directory):
+    """
+    Two consecutive CDL files of about `rows` courses: some cells changed, some courses removed and added
+    """
+    start = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 180, rows), unit='D')
+    registered = rng.integers(0, 30, rows)
+    enrolled = rng.integers(0, 40, rows)
+    old = pd.DataFrame({
+        'Pillar': rng.choice(['FIT', 'HCML', 'BM', 'SOBI', 'No dept'], rows),
+        'Course No.': np.arange(100000, 100000 + rows),
+        'Course Title': course_titles(rng, rows),
+        'Status': rng.choice(['Open', 'Confirmed'], rows),
+        'Course Run ID': [f'CRS-{number}' for number in range(rows)],
+        'Mode of Delivery': rng.choice(['F2F', 'Online'], rows),
+        'Type of Runs (Public or Corporate)': rng.choice(['Public', 'Corporate : ACME Pte Ltd', '-'], rows),
+        'Start Date': start.strftime('%Y-%m-%d'),
+        'End Date': (start + pd.to_timedelta(rng.integers(0, 14, rows), unit='D')).strftime('%Y-%m-%d'),
+        'Session Date & Time': [f'{date} N1 : Mon 09:00 AM to 05:00 PM' for date in start.strftime('%Y-%m-%d')],
+        'Session Venue': rng.choice(session_venues, rows),
+        'Location by Date': rng.choice(session_venues, rows),
+        'Total no. of sessions': 'No. of sessions: 1 \nNo. of assessments: 0',
+        'Registered Pax': registered,
+        'Enrolled Pax': enrolled,
+        'Total Pax': registered + enrolled,
+        'Venue Category': rng.choice(['SMU', 'Online', 'External'], rows),
+        'Last Updated': 'Last Updated: -',
+    })
+
+    new = old[rng.random(rows) >= 0.01].copy()
+    changed = rng.random(len(new)) < 0.05
+    new.loc[changed, 'Status'] = 'Cancelled'
+    new.loc[changed, 'Session Venue'] = rng.choice(session_venues, changed.sum())
+    new.loc[changed, 'Total Pax'] += 1
+    added = old.sample(n=max(rows // 50, 1), random_state=rng.integers(1 << 31))
+    added['Course No.'] = np.arange(100000 + rows, 100000 + rows + len(added))
+    new = pd.concat([new, added])
+
+    write_excel(old, os.path.join(directory, 'CDL_20240101_0900.xlsx'))
+    write_excel(new, os.path.join(directory, 'CDL_20240108_0900.xlsx'))
+    # The comparison looks for the CDL files in the parent of the directory it runs from
+    os.makedirs(os.path.join(directory, 'src'), exist_ok=True)
+
+
+def generate_bookings(rng, rows, directory):
+    """
+    TMS sessions and FBS bookings (`rows` of each): most sessions have a booking containing them,
+    some bookings are too short, in another venue, or under a purpose matching no course
+    """
+    titles = np.array(course_titles(rng, max(rows // 20, 1)))
+    title = rng.choice(titles, rows)
+    date = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 180, rows), unit='D')
+    start = pd.to_timedelta(rng.choice([9, 10, 14, 19], rows), unit='h')
+    end = start + pd.to_timedelta(rng.choice([2, 3, 4], rows), unit='h')
+    venue = rng.choice(booking_venues, rows)
+
+    write_excel(pd.DataFrame({
+        'Course Title': title,
+        'Session Date': date,
+        'S-Time': (pd.Timestamp(0) + start).strftime('%I:%M %p'),
+        'E-Time': (pd.Timestamp(0) + end).strftime('%I:%M %p'),
+        'Venue': venue,
+        'Trainer': 'benchmark',
+    }), os.path.join(directory, 'TMS.xlsx'))
+
+    unmatched = rng.random(rows) < 0.05
+    purpose = np.array([value[:30] for value in title], dtype=object)
+    purpose[unmatched] = 'Ad hoc booking'
+    other_venue = rng.random(rows) < 0.1
+    short = rng.random(rows) < 0.1
+    booking_start = start - pd.to_timedelta(30, unit='min')
+    booking_end = end + pd.to_timedelta(np.where(short, -60, 30), unit='min')
+
+    order = rng.permutation(rows)
+    write_excel(pd.DataFrame({
+        'Facility': np.where(other_venue, rng.choice(booking_venues, rows), venue)[order],
+        'Booking Date': date[order],
+        'Booking Start Time': (pd.Timestamp(0) + booking_start).strftime('%H:%M')[order],
+        'Booking End Time': (pd.Timestamp(0) + booking_end).strftime('%H:%M')[order],
+        'Booking Owner': 'benchmark',
+        'Purpose': purpose[order],
+        'Status': 'Approved',
+    }), os.path.join(directory, 'FBS.xlsx'))
+
+
+def generate_bulk_booking(rng, rows, directory):
+    """
+    Bulk booking template of `rows` bookings (after the row describing the columns), as xlsx and csv,
+    and an error report rejecting about 5% of them, single rows and ranges
+    """
+    date = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 180, rows), unit='D')
+    time_slot = rng.integers(0, len(start_times), rows)
+    template = pd.DataFrame({
+        'Facility': rng.choice(booking_venues, rows),
+        'Booking Date': date.strftime('%d-%b-%Y'),
+        'Start Time': start_times[time_slot],
+        'End Time': end_times[time_slot],
+        'Purpose': rng.choice(course_titles(rng, max(rows // 20, 1)), rows),
+        'Booking Owner': 'benchmark',
+        'Remarks': rng.choice(['', 'Projector needed'], rows),
+    })
+    description = pd.DataFrame([['Room name', 'DD-MMM-YYYY', 'HH:MM AM', 'HH:MM AM', 'Course title', 'Owner', '']],
+                               columns=template.columns)
+    template = pd.concat([description, template])
+
+    write_excel(template, os.path.join(directory, 'Bulk Booking Template.xlsx'))
+    template.to_csv(os.path.join(directory, 'Bulk Booking Template.csv'), index=False)
+
+    rejected = np.sort(rng.choice(np.arange(1, rows + 1), max(rows // 20, 1), replace=False))
+    with open(os.path.join(directory, 'Error Report.txt'), 'w') as report:
+        for number, row in enumerate(rejected):
+            if number % 50 == 0:
+                report.write(f'Rows {row}-{min(row + 3, rows)}: Facility is not available\n')
+            else:
+                report.write(f'Row {row}: Booking time is outside of the opening hours\n')
+
+
+def generate(directory, rows, seed=0):
+    """
+    Write all the input files for `rows` rows in `directory`
+    """
+    if not 0 < rows <= MAX_ROWS:
+        raise ValueError(f"rows must be between 1 and {MAX_ROWS}")
+
+    rng = np.random.default_rng(seed)
+    for name, generator in [('collation', generate_collation), ('deep-comparison', generate_cdl),
+                            ('verify', generate_bookings), ('bulk-booking', generate_bulk_booking)]:
+        os.makedirs(os.path.join(directory, name), exist_ok=True)
+        generator(rng, rows, os.path.join(directory, name))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate synthetic input files for the benchmarks.")
+    parser.add_argument("rows", type=int, nargs='+', help="number of rows of the files, e.g. 1000 100000")
+    parser.add_argument("--out", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'),
+                        help="directory of the generated files (one sub-directory per number of rows)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        generate(os.path.join(args.out, str(rows)), rows, args.seed)
+        print(f"Generated {rows} rows in {os.path.join(args.out, str(rows))}")
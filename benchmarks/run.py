@@ -0,0 +1,379 @@
+"""
+Benchmarks of the four tools on synthetic data.
+
+Every tool runs in its own process on the files of `generate.py`, through the
+same functions as its script or view, one named stage at a time (reading,
+structuring, comparing, verifying, exporting, ...). The stages the tools run
+inside them (`profiled` functions and `stage` blocks, e.g. the
+`structure_data` step of `collate`) are kept too, named after the stages
+running them: `collate/structure_data`. The wall time and the peak of memory
+allocated (tracemalloc) during each stage, measured with
+`smua_common.profiling`, are appended to a JSONL results file together with
+the commit and the number of rows, and the run is compared with the previous
+run of the same stages to spot regressions.
+
+The parse cache is disabled and the CDL snapshots are removed first, so every
+run reads the Excel files; the `read_snapshots` stage measures the snapshots.
+"""
+import argparse
+import contextlib
+import datetime as dt
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+
+# Shared helpers (`smua_common`) live at the root of the repository
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, root)
+
+from smua_common.profiling import profiling, stage
+
+from generate import generate
+
+benchmarks_dir = os.path.dirname(os.path.abspath(__file__))
+default_data = os.path.join(benchmarks_dir, 'data')
+default_results = os.path.join(benchmarks_dir, 'results.jsonl')
+
+
+def bench_collation(stage, data):
+    """
+    `data-collation/merge_files.py`
+    """
+    sys.path.insert(0, os.path.join(root, 'data-collation'))
+    import merge_files
+    from smua_common.collation.engine import collate, load_config, write_cdl
+
+    config = load_config()
+    os.chdir(os.path.join(data, 'collation'))
+
+    with stage('read_files') as record:
+        session, schedule, enroll = merge_files.read_files()
+        record['rows'] = len(session)
+
+    with stage('collate') as record:
+        data_df, long_period_df = collate(session, schedule, enroll, config)
+        record['rows'] = len(data_df)
+
+    with stage('export'):
+        write_cdl('CDL_benchmark.xlsx', data_df, long_period_df, config['days'])
+
+
+def bench_compare(stage, data):
+    """
+    `deep-comparison/src/compare_files.py`
+    """
+    directory = os.path.join(data, 'deep-comparison')
+    for file in os.listdir(directory):
+        if file.endswith('.snapshot') or file.startswith('Combined_CDL') or file.startswith('cdl_'):
+            os.remove(os.path.join(directory, file))
+
+    # The CDL files are found in the parent of the directory the comparison runs from
+    os.chdir(os.path.join(directory, 'src'))
+    sys.path.insert(0, os.path.join(root, 'deep-comparison', 'src'))
+    import compare_files
+    from smua_common.table import KeyedTable
+
+    with stage('read_files') as record:
+        compare_files.files_df.extend(compare_files.read_file(file) for file in compare_files.files)
+        record['rows'] = sum(len(frame) for frame in compare_files.files_df)
+
+    # The rows of the CDL files keyed by `Course No.` (formerly converted to dicts)
+    with stage('index_rows') as record:
+        compare_files.files_dict.extend(KeyedTable(frame, "Course No.") for frame in compare_files.files_df)
+        record['rows'] = sum(len(table) for table in compare_files.files_dict)
+
+    with stage('read_snapshots') as record:
+        record['rows'] = sum(len(compare_files.read_file(file)) for file in compare_files.files)
+
+    with stage('check_differences') as record:
+        diff = compare_files.check_differences()
+        record['rows'] = len(diff.changes)
+
+    with stage('structure_data') as record:
+        compare_files.new_data = compare_files.structure_data(diff)
+        record['rows'] = len(compare_files.new_data)
+
+    with stage('export'):
+        compare_files.export_to_file()
+
+
+def bench_verify(stage, data):
+    """
+    `verify-bookings/verify.py`, with the per-session and the vectorized verification
+    """
+    os.chdir(os.path.join(data, 'verify'))
+    sys.path.insert(0, os.path.join(root, 'verify-bookings'))
+    import pandas as pd
+    import verify
+
+    with stage('read_files') as record:
+        _, tms, fbs = verify.read_files()
+        record['rows'] = len(tms) + len(fbs)
+
+    with stage('fbs_tms_title_mapping') as record:
+        verify.fbs_tms_title_mapping(fbs, tms)
+        record['rows'] = len(fbs)
+
+    with stage('verify_bookings') as record:
+        res = verify.verify_bookings(tms, verify.BookingIndex(fbs))
+        record['rows'] = len(res)
+
+    with stage('verify_bookings_vectorized') as record:
+        record['rows'] = len(verify.verify_bookings_vectorized(tms, fbs))
+
+    with stage('export'):
+        verify.write_frame('output.xlsx', pd.DataFrame(res, columns=verify.new_tms_header),
+                           verify.output_header, verify.output_columns, verify.remark_highlights)
+
+
+def setup_django(project_dir, settings_module):
+    sys.path.insert(0, project_dir)
+    os.environ['DJANGO_SETTINGS_MODULE'] = settings_module
+    os.environ.setdefault('DJANGO_SECRET', 'benchmark')
+
+    import django
+    from django.conf import settings
+    django.setup()
+    settings.ALLOWED_HOSTS.append('testserver')
+
+
+def uploaded_file(path):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    with open(path, 'rb') as file:
+        return SimpleUploadedFile(os.path.basename(path), file.read())
+
+
+def check_response(response):
+    """
+    Read the whole response, which must be a download
+    """
+    content = response.getvalue()
+    if response.status_code != 200 or 'attachment' not in response.get('Content-Disposition', ''):
+        raise RuntimeError(f"Unexpected response {response.status_code}: {content[:200]!r}")
+
+
+def bench_web_collation(stage, data):
+    """
+    `data-collation/data-collation-web`: the steps of the `home` view, then a whole upload
+    """
+    setup_django(os.path.join(root, 'data-collation', 'data-collation-web'), 'web.settings')
+    from django.test import Client
+    from smua_common.collation.engine import read_exports, write_cdl
+    from web_fa import views
+
+    directory = os.path.join(data, 'collation')
+    names = ['gvSession.xlsx', 'Manage Schedule.xlsx', 'Enrolment Summary.xlsx']
+
+    with stage('read_files') as record:
+        session, schedule, enroll = read_exports(*(os.path.join(directory, name) for name in names))
+        record['rows'] = len(session)
+
+    with stage('collate') as record:
+        data_df, long_period_df = views.get_output_data(session, schedule, enroll, 6)
+        record['rows'] = len(data_df)
+
+    with stage('export'):
+        write_cdl(io.BytesIO(), data_df, long_period_df, 6)
+
+    files = [uploaded_file(os.path.join(directory, name)) for name in names]
+    with stage('request'):
+        response = Client().post('/', {'gv_file': files[0], 'schedule_file': files[1],
+                                       'enrollment_summary_file': files[2], 'days_input': 6})
+        check_response(response)
+
+
+def bench_web_bulk_booking(stage, data):
+    """
+    `bulk-booking-rejection`: the steps of the `home` view for xlsx and csv templates, then a whole upload
+    """
+    setup_django(os.path.join(root, 'bulk-booking-rejection', 'src'), 'smua.settings')
+    import numpy as np
+    import pandas as pd
+    from django.core.files import File
+    from django.test import Client
+    from smua_fa import views
+    from smua_fa.streaming import stream_zip_csvs, stream_zip_rows
+
+    directory = os.path.join(data, 'bulk-booking')
+    with open(os.path.join(directory, 'Error Report.txt')) as file:
+        error_text = file.read()
+
+    with stage('read_files') as record:
+        df = pd.read_excel(os.path.join(directory, 'Bulk Booking Template.xlsx')).fillna('-')
+        record['rows'] = len(df)
+
+    with stage('split_data') as record:
+        success_data, error_data = views.split_data(np.asarray(df, dtype='object')[1:], error_text)
+        record['rows'] = len(error_data)
+
+    with stage('export'):
+        files = [(views.success_file, success_data), (views.error_file, error_data)]
+        for _ in stream_zip_csvs(files, df.columns):
+            pass
+
+    with open(os.path.join(directory, 'Bulk Booking Template.csv'), 'rb') as file:
+        with stage('export_csv'):
+            upload = File(file)
+            headers, success_rows, error_rows = views.split_csv_data(upload, error_text, views.csv_encoding(upload))
+            files = [(views.success_file, headers, success_rows), (views.error_file, headers, error_rows)]
+            for _ in stream_zip_rows(files):
+                pass
+
+    template = uploaded_file(os.path.join(directory, 'Bulk Booking Template.xlsx'))
+    with stage('request'):
+        response = Client().post('/', {'input_field': error_text, 'file': template})
+        check_response(response)
+
+
+tools = {
+    'collation': bench_collation,
+    'compare': bench_compare,
+    'verify': bench_verify,
+    'web-collation': bench_web_collation,
+    'web-bulk-booking': bench_web_bulk_booking,
+}
+
+
+def run_tool(tool, data):
+    """
+    Run the stages of one tool in this process and print their records as JSON lines
+    """
+    # Every run parses the workbooks
+    os.environ['SMUA_CACHE_MAX_BYTES'] = '0'
+
+    # The output of the tools is not part of the results
+    with profiling() as profile, contextlib.redirect_stdout(sys.stderr):
+        tools[tool](stage, os.path.abspath(data))
+
+    # The stages of the tools themselves run inside the stages of the benchmark
+    for record in nested_stages(profile):
+        print(json.dumps({key: round(value, 4) if isinstance(value, float) else value
+                          for key, value in record.items() if key != 'depth'}))
+
+
+def nested_stages(profile):
+    """
+    The stages of a profile in start order, nested stages named after the stages running them.
+    A stage named like the stage running it (the `profiled` function a benchmark stage is named after)
+    is left out, its own nested stages are named after the benchmark stage.
+    """
+    path = []
+    for record in profile.in_start_order():
+        del path[record['depth']:]
+        name = record['stage']
+        path.append(name)
+        if len(path) > 1 and name == path[-2]:
+            # Shared with the enclosing stage, which the stages nested in this one are named after
+            continue
+
+        yield {**record, 'stage': '/'.join(dict.fromkeys(path))}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=root, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def read_results(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def run_benchmarks(rows_list, tool_names, data_dir, results_path, seed):
+    """
+    Run the tools in separate processes for every number of rows, and append their records to the results.
+    Returns the id of the run.
+    """
+    run_id = dt.datetime.now().strftime('%Y%m%d_%H%M%S')
+    run_info = {'run': run_id, 'commit': git_commit(), 'python': platform.python_version()}
+
+    for rows in rows_list:
+        data = os.path.join(data_dir, str(rows))
+        if not os.path.isdir(data):
+            print(f"Generating {rows} rows in {data}")
+            generate(data, rows, seed)
+
+        for tool in tool_names:
+            process = subprocess.run([sys.executable, os.path.abspath(__file__), '--tool', tool, '--data', data],
+                                     capture_output=True, text=True)
+            if process.returncode != 0:
+                print(process.stderr, file=sys.stderr)
+                exit(f"{tool} failed on {rows} rows")
+
+            with open(results_path, 'a') as file:
+                for line in process.stdout.splitlines():
+                    record = {**run_info, 'tool': tool, 'size': rows, **json.loads(line)}
+                    file.write(json.dumps(record) + '\n')
+
+    return run_id
+
+
+def compare_runs(results_path, threshold, min_seconds=0.05):
+    """
+    Print the stages of the last run next to their previous measurement.
+    Returns the number of stages slower than `threshold` (e.g. 0.2 for 20%) by more than `min_seconds`.
+    """
+    results = read_results(results_path)
+    if not results:
+        exit(f"No results in {results_path}")
+
+    last_run = results[-1]['run']
+    previous = {}
+    regressions = 0
+
+    print(f"Run {last_run} ({results[-1]['commit']})")
+    print(f"{'tool':<18}{'size':>9}  {'stage':<40}{'seconds':>9}{'previous':>10}{'change':>9}{'peak MB':>10}")
+
+    for record in results:
+        key = (record['tool'], record['size'], record['stage'])
+        if record['run'] != last_run:
+            previous[key] = record
+            continue
+
+        before = previous.get(key)
+        seconds_before, change, flag = '-', '', ''
+        if before is not None and before['seconds'] > 0:
+            seconds_before = f"{before['seconds']:.3f}"
+            ratio = record['seconds'] / before['seconds'] - 1
+            change = f'{ratio:+.0%}'
+            if ratio > threshold and record['seconds'] - before['seconds'] > min_seconds:
+                flag = '  <- slower'
+                regressions += 1
+
+        print(f"{record['tool']:<18}{record['size']:>9}  {record['stage']:<40}{record['seconds']:>9.3f}"
+              f"{seconds_before:>10}{change:>9}{record['peak_mb']:>10.1f}{flag}")
+
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the tools on synthetic data and compare with the previous run.")
+    parser.add_argument("--rows", type=int, nargs='+', default=[1000, 10000],
+                        help="numbers of rows to benchmark, e.g. 1000 100000 1000000")
+    parser.add_argument("--tools", nargs='+', choices=list(tools), default=list(tools))
+    parser.add_argument("--data", default=default_data, help="directory of the generated files")
+    parser.add_argument("--results", default=default_results, help="JSONL file the results are appended to")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the generated files")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="slowdown from the previous run reported as a regression (0.2 = 20%%)")
+    parser.add_argument("--compare", action="store_true",
+                        help="only compare the last run with the previous one; exits with 1 on regressions")
+    parser.add_argument("--tool", choices=list(tools), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.tool:
+        run_tool(args.tool, args.data)
+    elif args.compare:
+        exit(1 if compare_runs(args.results, args.threshold) else 0)
+    else:
+        run_benchmarks(args.rows, args.tools, args.data, args.results, args.seed)
+        regressions = compare_runs(args.results, args.threshold)
+        print(f"\n{regressions} stage(s) slower than the previous run by more than {args.threshold:.0%}")
@@ -13,12 +13,18 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 # from dotenv import load_dotenv
 import os
 from pathlib import Path
+import sys
 
 # load_dotenv()
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Shared helpers (`smua_common`) are installed from the root of the repository by requirements.txt
+# (the deployed site only contains this folder); in a checkout, the edited sources are used instead
+if (BASE_DIR.parent.parent / 'smua_common').is_dir():
+    sys.path.insert(0, str(BASE_DIR.parent.parent))
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
@@ -45,6 +51,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'smua_common.profiling.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -121,3 +128,23 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Stream the zip of the success/error CSV files in chunks, instead of building it in memory first
+STREAM_ZIP_DOWNLOADS = os.getenv('STREAM_ZIP_DOWNLOADS', 'True') == 'True'
+
+# Serve the async views (when running behind `asgi.py`), which process the uploads in a pool of UPLOAD_WORKERS threads
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False') == 'True'
+UPLOAD_WORKERS = int(os.getenv('UPLOAD_WORKERS', '4'))
+
+# Time of the stages of every request, in a `Server-Timing` header and a log line; with their memory peak when PROFILE_MEMORY is set
+PROFILE_MEMORY = os.getenv('PROFILE_MEMORY', 'False') == 'True'
+
+# Budget of the cold import of the website (`python manage.py importtime` fails over it), in milliseconds
+IMPORT_TIME_BUDGET_MS = float(os.getenv('IMPORT_TIME_BUDGET_MS', '500'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {'console': {'class': 'logging.StreamHandler'}},
+    'loggers': {'smua_common.profiling': {'handlers': ['console'], 'level': 'INFO'}},
+}
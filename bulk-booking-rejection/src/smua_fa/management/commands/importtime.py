@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from smua_common.importtime import import_report, measure_imports, total_ms
+
+
+class Command(BaseCommand):
+    help = ("Import the website in a new interpreter, as on a cold start, report the time taken per package "
+            "and module (python -X importtime), and fail when it is over IMPORT_TIME_BUDGET_MS")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--budget', type=float, default=settings.IMPORT_TIME_BUDGET_MS,
+                            help="budget of the cold import, in milliseconds")
+        parser.add_argument('--top', type=int, default=15, help="number of packages and modules listed")
+
+    def handle(self, *args, **options):
+        # The WSGI application served by Vercel, and the views loaded by the first request
+        modules = [settings.WSGI_APPLICATION.rsplit('.', 1)[0], settings.ROOT_URLCONF]
+        try:
+            records = measure_imports(modules, cwd=settings.BASE_DIR)
+        except RuntimeError as error:
+            raise CommandError(error)
+
+        self.stdout.write(import_report(records, options['top']))
+
+        total, budget = total_ms(records), options['budget']
+        if total > budget:
+            raise CommandError(f"Cold import took {total:.0f} ms, over the budget of {budget:.0f} ms")
+        self.stdout.write(self.style.SUCCESS(f"Cold import took {total:.0f} ms, within the budget of {budget:.0f} ms"))
@@ -0,0 +1,105 @@
+"""
+Zip archives of CSV files, streamed in chunks.
+
+The archive is written into a buffer that only counts and collects the bytes
+written to it. As the buffer cannot seek, `zipfile` writes every member with
+a data descriptor instead of going back to patch its header, so the bytes
+written so far can be handed to the response and dropped after every chunk
+of rows. Memory stays flat whatever the size of the files, and the download
+starts with the first rows.
+"""
+import csv
+import io
+import zipfile
+
+# Number of rows written to the CSV files between two chunks of the response
+CHUNK_ROWS = 1000
+
+
+class _ChunkBuffer(io.RawIOBase):
+  """
+    Write-only, unseekable file keeping the bytes written since they were last taken.
+  """
+
+  def __init__(self):
+    self._chunks = []
+    self._position = 0
+
+  def writable(self):
+    return True
+
+  def write(self, data):
+    self._chunks.append(bytes(data))
+    self._position += len(data)
+    return len(data)
+
+  def tell(self):
+    return self._position
+
+  def take(self):
+    data = b''.join(self._chunks)
+    self._chunks = []
+    return data
+
+
+def stream_zip_csvs(files, headers, date_format="%d-%b-%Y"):
+  """
+    Generator of the chunks of a zip archive holding one CSV file per (name, rows) of `files`.
+    Files without rows are left out of the archive.
+  """
+  import pandas as pd
+
+  buffer = _ChunkBuffer()
+
+  with zipfile.ZipFile(buffer, 'w') as zip_file:
+    for name, rows in files:
+      if len(rows) == 0:
+        continue
+
+      data = pd.DataFrame(rows, columns=headers)
+      with zip_file.open(name, 'w') as member:
+        text = io.TextIOWrapper(member, encoding='utf-8', newline='')
+        for start in range(0, len(data), CHUNK_ROWS):
+          data.iloc[start:start + CHUNK_ROWS].to_csv(text, header=start == 0, index=False, date_format=date_format)
+          text.flush()
+          yield buffer.take()
+        text.detach()
+
+      yield buffer.take()
+
+  # Central directory of the archive
+  yield buffer.take()
+
+
+def stream_zip_rows(files):
+  """
+    Generator of the chunks of a zip archive holding one CSV file per (name, headers, rows) of `files`,
+    `rows` being an iterable of lists of fields that is only read while the archive is sent.
+    Files without rows are left out of the archive.
+  """
+  buffer = _ChunkBuffer()
+
+  with zipfile.ZipFile(buffer, 'w') as zip_file:
+    for name, headers, rows in files:
+      rows = iter(rows)
+      first_row = next(rows, None)
+      if first_row is None:
+        continue
+
+      with zip_file.open(name, 'w') as member:
+        text = io.TextIOWrapper(member, encoding='utf-8', newline='')
+        writer = csv.writer(text, lineterminator='\n')
+        writer.writerow(headers)
+        writer.writerow(first_row)
+        for count, row in enumerate(rows, start=2):
+          writer.writerow(row)
+          if count % CHUNK_ROWS == 0:
+            text.flush()
+            yield buffer.take()
+        text.flush()
+        text.detach()
+
+      yield buffer.take()
+
+  # Central directory of the archive
+  yield buffer.take()
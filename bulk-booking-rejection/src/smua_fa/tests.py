@@ -1,3 +1,133 @@
-from django.test import TestCase
+import io
+from unittest import mock
+import zipfile
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+import pandas as pd
+
+from smua_fa.streaming import stream_zip_csvs, stream_zip_rows
+from smua_fa.views import error_file, get_error_rows, success_file
+
+
+class ErrorRowsTests(SimpleTestCase):
+    def rows(self, error_text, max_row=100):
+        return get_error_rows(error_text, max_row).tolist()
+
+    def test_single_rows(self):
+        self.assertEqual(self.rows("Row 3 status: SOE/SCIS2 Seminar Room 2-3 on 21-Jul-2023 08:00 – 18:00 (10hrs)\n"
+                                   "Row 13 status: the specified booking time is being booked by another user."), [3, 13])
+
+    def test_lists_and_ranges(self):
+        self.assertEqual(self.rows("Rows 5-8, 12 and 14 to 15"), [5, 6, 7, 8, 12, 14, 15])
+        self.assertEqual(self.rows("Row(s): 20, 21"), [20, 21])
+
+    def test_number_after_a_dash_is_not_a_range_end(self):
+        self.assertEqual(self.rows("Row 12 - 3 facilities unavailable"), [12])
+
+    def test_date_is_not_a_row(self):
+        self.assertEqual(self.rows("Row 3, 2024-01-05 is a public holiday"), [3])
+
+    def test_reversed_range_is_swapped(self):
+        self.assertEqual(self.rows("Rows 9-4"), [4, 5, 6, 7, 8, 9])
+
+    def test_rows_are_capped(self):
+        self.assertEqual(self.rows("Rows 8 to 12\nRow 30", max_row=10), [8, 9, 10])
+
+
+class HomeFormTests(SimpleTestCase):
+    def test_missing_error_message_is_shown(self):
+        response = self.client.post('/', {'file': SimpleUploadedFile('template.csv', b'Facility,Date\nx,y\n')})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Enter the error message or upload the error report.")
+
+
+@override_settings(STREAM_ZIP_DOWNLOADS=True)
+class CsvUploadTests(SimpleTestCase):
+    def post(self, content, error_text="Row 2 status: invalid"):
+        return self.client.post('/', {'input_field': error_text, 'file': SimpleUploadedFile('template.csv', content)})
+
+    def zip_files(self, response):
+        self.assertEqual(response.status_code, 200)
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        return {name: archive.read(name).decode('utf-8') for name in archive.namelist()}
+
+    def test_windows_encoding(self):
+        content = "Venue,Purpose\nexample,-\nCafé,Séminaire\nRoom 2–1,Training\n".encode('cp1252')
+
+        files = self.zip_files(self.post(content))
+
+        self.assertEqual(files[success_file], "Venue,Purpose\nCafé,Séminaire\n")
+        self.assertEqual(files[error_file], "Venue,Purpose\nRoom 2–1,Training\n")
+
+    def test_carriage_return_line_endings(self):
+        files = self.zip_files(self.post(b"Venue,Purpose\rexample,-\rRoom 1,A\rRoom 2,B\rRoom 3,C\r"))
+
+        self.assertEqual(files[success_file], "Venue,Purpose\nRoom 1,A\nRoom 3,C\n")
+        self.assertEqual(files[error_file], "Venue,Purpose\nRoom 2,B\n")
+
+    def test_unreadable_encoding_is_a_form_error(self):
+        response = self.post(b"Venue,Purpose\nexample,-\nRoom \x81,A\n")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.streaming)
+        self.assertContains(response, "The CSV file could not be read")
+
+
+def read_zip(content):
+    archive = zipfile.ZipFile(io.BytesIO(content))
+    return {name: archive.read(name).decode('utf-8') for name in archive.namelist()}
+
+
+class StreamingZipTests(SimpleTestCase):
+    def test_chunks_make_one_archive(self):
+        rows = [[f'Room {number}', number] for number in range(25)]
+
+        with mock.patch('smua_fa.streaming.CHUNK_ROWS', 10):
+            chunks = [chunk for chunk in stream_zip_rows([(success_file, ['Venue', 'Pax'], rows),
+                                                          (error_file, ['Venue', 'Pax'], [])])]
+
+        self.assertGreater(len([chunk for chunk in chunks if chunk]), 3)
+        files = read_zip(b''.join(chunks))
+        # Files without rows are left out
+        self.assertEqual(list(files), [success_file])
+        self.assertEqual(files[success_file].splitlines(),
+                         ['Venue,Pax'] + [f'Room {number},{number}' for number in range(25)])
+
+    def test_frames(self):
+        rows = [['Room 1', pd.Timestamp('2024-01-05')], ['Room 2', pd.Timestamp('2024-01-06')]]
+
+        with mock.patch('smua_fa.streaming.CHUNK_ROWS', 1):
+            chunks = stream_zip_csvs([(success_file, rows), (error_file, rows[:1])], ['Venue', 'Date'])
+            files = read_zip(b''.join(chunks))
+
+        self.assertEqual(files[success_file], "Venue,Date\nRoom 1,05-Jan-2024\nRoom 2,06-Jan-2024\n")
+        self.assertEqual(files[error_file], "Venue,Date\nRoom 1,05-Jan-2024\n")
+
+
+class XlsxUploadTests(SimpleTestCase):
+    def post(self):
+        template = io.BytesIO()
+        pd.DataFrame({
+            'Venue': ['example', 'Room 1', 'Room 2', 'Room 3'],
+            'Date': [pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-05'), pd.Timestamp('2024-01-06'), '-'],
+            'Pax': [0, 10, 20, 30],
+        }).to_excel(template, index=False)
+
+        response = self.client.post('/', {'input_field': "Row 2 status: the venue is booked",
+                                           'file': SimpleUploadedFile('template.xlsx', template.getvalue())})
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_streamed_zip_same_as_built_zip(self):
+        with self.settings(STREAM_ZIP_DOWNLOADS=True):
+            response = self.post()
+            self.assertTrue(response.streaming)
+            streamed = read_zip(b''.join(response.streaming_content))
+
+        with self.settings(STREAM_ZIP_DOWNLOADS=False):
+            built = read_zip(self.post().content)
+
+        self.assertEqual(streamed, built)
+        self.assertEqual(streamed[error_file].splitlines()[1:], ['Room 2,06-Jan-2024,20'])
@@ -1,6 +1,7 @@
+from django.conf import settings
 from django.urls import path
-from smua_fa.views import home 
+from smua_fa.views import home, home_async
 
 urlpatterns = [
-    path('', home, name='home')
+    path('', home_async if settings.ASYNC_VIEWS else home, name='home')
 ]
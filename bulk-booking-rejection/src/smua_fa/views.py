@@ -1,20 +1,36 @@
 from django.shortcuts import render
 from django import forms
-import pandas as pd
-import numpy as np
 import re
-from django.http import HttpResponse
+import codecs
+import csv
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
 import io
-import zipfile
 
-headers = None
+from smua_common.profiling import profiled, stage
+from smua_common.workers import iterate_in_pool, new_pool, run_in_pool
+
+# pandas, numpy and zipfile are imported by the functions processing an upload, not at startup:
+# a cold start serving the upload form does not pay for them (see `manage.py importtime`)
+
 success_file, error_file = "Bulk Booking Template(Success).csv", "Bulk Booking Template(Error).csv"
 
+# Threads processing the uploads of `home_async`
+upload_pool = new_pool(settings.UPLOAD_WORKERS, "upload")
+
 class InputForm(forms.Form):
-  input_field = forms.CharField(widget=forms.Textarea)
+  input_field = forms.CharField(widget=forms.Textarea, required=False)
+  error_file = forms.FileField(label="Upload the error report", required=False)
   file = forms.FileField(label="Upload CSV or Excel Sheet")
+
+  def clean(self):
+    cleaned_data = super().clean()
+    if not cleaned_data.get("input_field") and not cleaned_data.get("error_file"):
+      raise forms.ValidationError("Enter the error message or upload the error report.")
+    return cleaned_data
   
-def separate_files(success_data, error_data):
+def separate_files(success_data, error_data, headers):
+    import pandas as pd
     success_data_response, error_data_response = None, None
     if len(success_data) > 0:
         success = pd.DataFrame(success_data, columns=headers)
@@ -34,67 +50,221 @@ def separate_files(success_data, error_data):
 
     return success_data_response, error_data_response
   
-def split_data(original_data, error_msg):
-  error_idx = set()
-  for error in error_msg:
-    match = re.search(r'Row \d+', error)
-    if match:
-      error_idx.add(int(match.group().split()[1],10)-1)
-  
-  error_data = []
-  success_data = []
-  for i in range(len(original_data)):
-    if i in error_idx:
-      error_data.append(original_data[i])
-    else:
-      success_data.append(original_data[i])
-      
-  return success_data, error_data
-
-def manipulate_excel_data(data):
-  """
-    Function to split Excel data into comma-separated array for easier manipulation. 
-    Excel sheet is unlike CSV data, it is not split by comma.
-  """
-  csv_data = data.to_csv(index=False).strip().splitlines()
-  csv_data_arr = [line.split(",") for line in csv_data]
-  np_arr = np.asarray(csv_data_arr, dtype="object")
-
-  return np_arr
-  
+# Rows mentioned in an error report: "Row 5", "Rows 5, 8", "Row(s) 5-8", "Rows 5 to 8 and 12", ...
+row_keyword_pattern = re.compile(r'\bRows?(?:\(s\))?:?\s*(?=\d)')
+row_number_pattern = re.compile(r'\d+')
+range_to_pattern = re.compile(r'\s*(?:-|–|to\b)\s*(?=\d)')
+row_separator_pattern = re.compile(r'\s*(?:,|&|and\b)\s*(?=\d)')
+# A bare row number ends the line, or is followed by punctuation, another row or the rest of the message,
+# unlike the numbers of a date ("2024-01-05") or of a quantity ("3 facilities")
+bare_row_end_pattern = re.compile(
+  r'(?=\s*(?:$|[,;:)]|\.(?!\d)|&|(?:and|to|status|is|are|was|were|has|have|had|cannot|could|failed|error)\b))',
+  re.MULTILINE)
+
+def row_ranges(error_text, start):
+  """
+    Ranges (first, last) of the rows listed in the error report from `start`, just after "Row".
+    The first row is always taken, like "Row 12" in "Row 12 - 3 facilities unavailable";
+    a range end, or a row after a comma or "and", only when it is a bare row number.
+    Reversed ranges ("Rows 9-4") are swapped.
+  """
+  ranges, position = [], start
+  while True:
+    number = row_number_pattern.match(error_text, position)
+    first = last = int(number.group())
+    position = number.end()
+
+    range_to = range_to_pattern.match(error_text, position)
+    if range_to:
+      end = row_number_pattern.match(error_text, range_to.end())
+      if bare_row_end_pattern.match(error_text, end.end()):
+        last, position = int(end.group()), end.end()
+
+    # A number further in the list that is neither a range nor a bare row is part of the message
+    if ranges and first == last and not bare_row_end_pattern.match(error_text, position):
+      break
+    ranges.append((min(first, last), max(first, last)))
+
+    separator = row_separator_pattern.match(error_text, position)
+    if not separator:
+      break
+    position = separator.end()
+
+  return ranges
+
+def get_error_rows(error_text, max_row):
+  """
+    Row numbers (starting from 1, up to `max_row`) mentioned in the error report, as an array.
+    Ranges are expanded, and a line can mention several rows.
+  """
+  import numpy as np
+  rows = []
+  for keyword in row_keyword_pattern.finditer(error_text):
+    for first, last in row_ranges(error_text, keyword.end()):
+      rows.append(np.arange(first, min(last, max_row) + 1))
+
+  return np.concatenate(rows) if rows else np.empty(0, dtype=int)
+
+@profiled(rows=lambda parts: len(parts[0]) + len(parts[1]))
+def split_data(original_data, error_text):
+  """
+    Split the rows into the rows without errors and the rows mentioned in the error report.
+  """
+  import numpy as np
+  error_idx = get_error_rows(error_text, len(original_data)) - 1
+  error_idx = error_idx[error_idx >= 0]
+
+  is_error = np.zeros(len(original_data), dtype=bool)
+  is_error[error_idx] = True
+
+  return original_data[~is_error], original_data[is_error]
+
+@profiled()
+def read_error_report(file):
+  """
+    Text of an uploaded error report. Excel sheets are flattened to the text of their cells.
+  """
+  if file.name.split('.')[-1] == 'xlsx':
+    import pandas as pd
+    report = pd.read_excel(file, header=None, dtype=str).fillna('')
+    return '\n'.join(report.agg(' '.join, axis=1))
+
+  return file.read().decode('utf-8-sig', errors='replace')
+
+# Encodings of the uploaded CSV files, in order of preference: UTF-8, then Excel's default on Windows
+csv_encodings = ['utf-8-sig', 'cp1252']
+
+def csv_encoding(file):
+  """
+    Encoding of an uploaded CSV file among `csv_encodings`, or None when none of them can read it
+  """
+  for encoding in csv_encodings:
+    decoder = codecs.getincrementaldecoder(encoding)()
+    try:
+      for chunk in file.chunks():
+        decoder.decode(chunk)
+      decoder.decode(b'', final=True)
+      return encoding
+    except UnicodeDecodeError:
+      pass
+
+  return None
+
+def read_csv_headers(file, encoding):
+  """
+    Headers (first line) of an uploaded CSV file
+  """
+  file.seek(0)
+  text = io.TextIOWrapper(file, encoding=encoding, newline='')
+  headers = next(csv.reader(text), [])
+  text.detach()
+
+  return headers
+
+def read_csv_rows(file, encoding, is_error, errors):
+  """
+    Rows of an uploaded CSV file that are in the error report (`errors`) or not, read lazily with the `csv` module.
+    Like in Excel sheets, the first row after the headers is left out, and empty fields are replaced with '-'.
+  """
+  file.seek(0)
+  text = io.TextIOWrapper(file, encoding=encoding, newline='')
+  try:
+    reader = csv.reader(text)
+    next(reader, None)
+    next(reader, None)
+    for number, row in enumerate(reader):
+      if is_error[number] == errors:
+        yield [field or '-' for field in row]
+  finally:
+    text.detach()
+
+@profiled()
+def split_csv_data(file, error_text, encoding):
+  """
+    Split the rows of an uploaded CSV file like `split_data`, without loading the file in memory:
+    returns the headers and the rows without errors and with errors, each read from the file when needed.
+  """
+  import numpy as np
+  # Every row ends with a line break ("\n", "\r\n" or "\r"), so there are no more rows than line break characters
+  max_rows = sum(chunk.count(b'\n') + chunk.count(b'\r') for chunk in file.chunks()) + 1
+
+  is_error = np.zeros(max_rows, dtype=bool)
+  error_idx = get_error_rows(error_text, max_rows) - 1
+  is_error[error_idx[error_idx >= 0]] = True
+
+  return (read_csv_headers(file, encoding),
+          read_csv_rows(file, encoding, is_error, False), read_csv_rows(file, encoding, is_error, True))
 
 def home(request):
-  global headers
   content = None
   input_form = InputForm()
   combined_response = None
 
   if request.method == "POST":
+    import numpy as np
+    import pandas as pd
+    import zipfile
+    from smua_fa.streaming import stream_zip_csvs, stream_zip_rows
+
     input_form = InputForm(request.POST, request.FILES)
     if input_form.is_valid():
-      input_value = input_form.cleaned_data["input_field"].split("\n")
-        
+      input_value = input_form.cleaned_data["input_field"]
+
+      # Errors can be pasted, or uploaded as the portal's error report for large reports
+      error_text = input_value
+      if input_form.cleaned_data["error_file"]:
+        error_text += "\n" + read_error_report(input_form.cleaned_data["error_file"])
+
       file = input_form.cleaned_data["file"]
       file_extension = file.name.split('.')[-1]
 
       # check file extensions
       if file_extension == 'xlsx':
-        df = pd.read_excel(file).fillna('-')
-        np_arr = np.asarray(df, dtype='object')
-        headers = df.columns
+        with stage('read_files') as record:
+          df = pd.read_excel(file).fillna('-')
+          np_arr = np.asarray(df, dtype='object')
+          headers = df.columns
+          record['rows'] = len(df)
         
-        success_data, error_data = split_data(np_arr[1:], input_value)
+        success_data, error_data = split_data(np_arr[1:], error_text)
 
-        success_data_response, error_data_response = separate_files(success_data, error_data)
+        if settings.STREAM_ZIP_DOWNLOADS:
+          # The CSV files are written into the zip while it is being sent
+          files = [(success_file, success_data), (error_file, error_data)]
+          streaming_response = StreamingHttpResponse(stream_zip_csvs(files, headers), content_type='application/zip')
+          streaming_response['Content-Disposition'] = 'attachment; filename="Bulk_Booking_Files.zip'
+          return streaming_response
 
-        combined_response = HttpResponse(content_type='application/zip')
-        combined_response['Content-Disposition'] = 'attachment; filename="Bulk_Booking_Files.zip'
+        with stage('export'):
+          success_data_response, error_data_response = separate_files(success_data, error_data, headers)
+
+          combined_response = HttpResponse(content_type='application/zip')
+          combined_response['Content-Disposition'] = 'attachment; filename="Bulk_Booking_Files.zip'
+
+          with zipfile.ZipFile(combined_response, 'w') as zip_file:
+            if success_data_response != None:
+                  zip_file.writestr(success_file,success_data_response.content)
+            if error_data_response != None:
+                  zip_file.writestr(error_file,error_data_response.content)
+
+        return combined_response
+      elif file_extension == 'csv':
+        # The encoding is checked before the response starts: a streamed response cannot turn into an error page
+        encoding = csv_encoding(file)
+        if encoding is None:
+          input_form.add_error('file', "The CSV file could not be read: save it as CSV UTF-8 (or Windows CSV) and upload it again.")
+          return render(request, 'home.html', {'input_form': input_form})
+
+        # CSV files are streamed through twice (rows without errors, then with errors) instead of being parsed into a DataFrame
+        csv_headers, success_rows, error_rows = split_csv_data(file, error_text, encoding)
+        files = [(success_file, csv_headers, success_rows), (error_file, csv_headers, error_rows)]
 
-        with zipfile.ZipFile(combined_response, 'w') as zip_file:
-          if success_data_response != None:
-                zip_file.writestr(success_file,success_data_response.content)
-          if error_data_response != None:
-                zip_file.writestr(error_file,error_data_response.content)
+        if settings.STREAM_ZIP_DOWNLOADS:
+          combined_response = StreamingHttpResponse(stream_zip_rows(files), content_type='application/zip')
+        else:
+          with stage('export'):
+            combined_response = HttpResponse(b''.join(stream_zip_rows(files)), content_type='application/zip')
+        combined_response['Content-Disposition'] = 'attachment; filename="Bulk_Booking_Files.zip'
 
         return combined_response
       else:
@@ -103,3 +273,13 @@ def home(request):
       return render(request, 'home.html', {'input_form': input_form, 'content': content, 'input_value': input_value})
 
   return render(request, 'home.html', {'input_form': input_form})
+
+async def home_async(request):
+  """
+    Same as `home`, with the upload processed in the upload pool so that the worker keeps serving other requests
+  """
+  response = await run_in_pool(upload_pool, home, request)
+  if response.streaming:
+    response.streaming_content = iterate_in_pool(upload_pool, response.streaming_content)
+
+  return response
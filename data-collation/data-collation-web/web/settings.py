@@ -13,12 +13,19 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 # from dotenv import load_dotenv
 from pathlib import Path
 import os
+import sys
+import tempfile
 
 # load_dotenv()
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Shared helpers (`smua_common`) are installed from the root of the repository by requirements.txt
+# (the deployed site only contains this folder); in a checkout, the edited sources are used instead
+if (BASE_DIR.parent.parent / 'smua_common').is_dir():
+    sys.path.insert(0, str(BASE_DIR.parent.parent))
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
@@ -45,6 +52,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'smua_common.profiling.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -121,3 +129,34 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Parse the three uploaded workbooks in separate processes (needs a host with several cores)
+PARALLEL_WORKBOOK_READS = os.getenv('PARALLEL_WORKBOOK_READS', 'False') == 'True'
+
+# Serve the async views (when running behind `asgi.py`), which process the uploads in a pool of UPLOAD_WORKERS threads
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False') == 'True'
+UPLOAD_WORKERS = int(os.getenv('UPLOAD_WORKERS', '4'))
+
+# A `data.json` file replacing the settings of the collation (`schools` and `days`) shared with `merge_files.py`,
+# which are installed with smua_common (`smua_common/collation/data.json`)
+COLLATION_CONFIG = os.getenv('COLLATION_CONFIG')
+
+# Background jobs: files kept in JOBS_DIR for JOB_TTL seconds, run by JOB_WORKERS threads
+JOBS_DIR = os.getenv('JOBS_DIR', os.path.join(tempfile.gettempdir(), 'smua-jobs'))
+JOB_TTL = int(os.getenv('JOB_TTL', str(24 * 60 * 60)))
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+# Queued or running jobs not updated for JOB_STALE_AFTER seconds have stopped with their process, and are marked failed
+JOB_STALE_AFTER = int(os.getenv('JOB_STALE_AFTER', '120'))
+
+# Time of the stages of every request, in a `Server-Timing` header and a log line; with their memory peak when PROFILE_MEMORY is set
+PROFILE_MEMORY = os.getenv('PROFILE_MEMORY', 'False') == 'True'
+
+# Budget of the cold import of the website (`python manage.py importtime` fails over it), in milliseconds
+IMPORT_TIME_BUDGET_MS = float(os.getenv('IMPORT_TIME_BUDGET_MS', '500'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {'console': {'class': 'logging.StreamHandler'}},
+    'loggers': {'smua_common.profiling': {'handlers': ['console'], 'level': 'INFO'}},
+}
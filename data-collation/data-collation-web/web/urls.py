@@ -1,6 +1,10 @@
+from django.conf import settings
 from django.urls import path
-from web_fa.views import home
+from web_fa.views import home, home_async, job_download, job_status, submit_job
 
 urlpatterns = [
-    path('', home, name='home'),
+    path('', home_async if settings.ASYNC_VIEWS else home, name='home'),
+    path('jobs/', submit_job, name='job_submit'),
+    path('jobs/<str:job_id>/', job_status, name='job_status'),
+    path('jobs/<str:job_id>/download/', job_download, name='job_download'),
 ]
@@ -0,0 +1,234 @@
+"""
+Background jobs for large data-collation runs.
+
+A submission is saved in the jobs directory, recorded in a small SQLite table
+and run by a local pool of worker threads, outside of the HTTP request. The
+job moves through the stages of the pipeline, which the status endpoint
+reports, and its result is kept on disk until it is downloaded.
+
+Jobs are identified by the hash of their inputs, so submitting the same files
+again returns the existing job instead of running it twice. Jobs and their
+results are deleted once they have not been updated for `JOB_TTL` seconds.
+
+The pool only lives as long as the process: a job whose process stopped
+(restart, frozen serverless instance) would never move again. While a job is
+queued or running, a heartbeat thread keeps it updated; a job that has not
+been updated for `JOB_STALE_AFTER` seconds is marked failed, so submitting the
+same files runs it again. Every submission is a new run of the job, with its
+own uploads, and only the current run of a job updates it.
+"""
+from contextlib import closing
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+from smua_common.profiling import log_profile, profiling
+from smua_common.workers import new_pool
+
+# Stages of a job, in order; a job that raised an error or stopped ends in 'failed'
+STAGES = ['queued', 'reading', 'structuring', 'writing', 'done']
+
+job_pool = new_pool(settings.JOB_WORKERS, "job")
+
+# Runs queued or running in this process, kept updated by the heartbeat thread
+_active_runs = set()
+_active_lock = threading.Lock()
+_heartbeat = None
+_heartbeat_wake = threading.Event()
+
+
+def _connect():
+    os.makedirs(settings.JOBS_DIR, exist_ok=True)
+    connection = sqlite3.connect(os.path.join(settings.JOBS_DIR, 'jobs.sqlite3'), timeout=30, isolation_level=None)
+    connection.row_factory = sqlite3.Row
+    connection.execute('CREATE TABLE IF NOT EXISTS jobs ('
+                       'id TEXT PRIMARY KEY, stage TEXT NOT NULL, error TEXT, filename TEXT, '
+                       'created REAL NOT NULL, updated REAL NOT NULL, run TEXT)')
+    # Tables created before jobs had runs
+    if 'run' not in {column['name'] for column in connection.execute('PRAGMA table_info(jobs)')}:
+        connection.execute('ALTER TABLE jobs ADD COLUMN run TEXT')
+    return connection
+
+
+def _update(job_id, run, **values):
+    """
+    Update a job, unless `run` is no longer its current run
+    """
+    columns = ''.join(f'{column} = ?, ' for column in values)
+    with closing(_connect()) as connection:
+        connection.execute(f'UPDATE jobs SET {columns}updated = ? WHERE id = ? AND run = ?',
+                           (*values.values(), time.time(), job_id, run))
+
+
+def _beat():
+    while True:
+        _heartbeat_wake.wait(settings.JOB_STALE_AFTER / 4)
+        _heartbeat_wake.clear()
+        with _active_lock:
+            runs = list(_active_runs)
+        if runs:
+            with closing(_connect()) as connection:
+                connection.execute(f'UPDATE jobs SET updated = ? WHERE run IN ({", ".join("?" * len(runs))})',
+                                   (time.time(), *runs))
+
+
+def _start_heartbeat():
+    global _heartbeat
+    with _active_lock:
+        if _heartbeat is None:
+            _heartbeat = threading.Thread(target=_beat, name="job-heartbeat", daemon=True)
+            _heartbeat.start()
+    # Runs at once, with the current interval
+    _heartbeat_wake.set()
+
+
+def _fail_stale(connection):
+    now = time.time()
+    connection.execute("UPDATE jobs SET stage = 'failed', error = ?, updated = ? "
+                       "WHERE stage NOT IN ('done', 'failed') AND updated < ?",
+                       ("The job stopped before the end (the server restarted), please submit it again",
+                        now, now - settings.JOB_STALE_AFTER))
+
+
+def input_dir(job_id, run=None):
+    """
+    Uploads of the runs of a job, or of one of its runs
+    """
+    return os.path.join(settings.JOBS_DIR, job_id, *([run] if run else []))
+
+
+def result_path(job_id):
+    return os.path.join(settings.JOBS_DIR, f'{job_id}.xlsx')
+
+
+def get_job_id(files, *params):
+    """
+    Hash of the content of the uploaded files and of the other parameters of the job
+    """
+    # Imported here, as the parse cache imports pandas
+    from smua_common.parse_cache import file_digest
+
+    job_hash = hashlib.sha256()
+    for name, file in sorted(files.items()):
+        job_hash.update(f'{name}={file_digest(file)};'.encode())
+    job_hash.update(repr(params).encode())
+
+    return job_hash.hexdigest()[:32]
+
+
+def purge_expired():
+    """
+    Delete the jobs (and their files) that have not been updated for `JOB_TTL` seconds
+    """
+    with closing(_connect()) as connection:
+        expired = [row['id'] for row in connection.execute('SELECT id FROM jobs WHERE updated < ?',
+                                                           (time.time() - settings.JOB_TTL,))]
+        for job_id in expired:
+            connection.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+            shutil.rmtree(input_dir(job_id), ignore_errors=True)
+            # The result, and the partial results of runs that stopped
+            for name in os.listdir(settings.JOBS_DIR):
+                if name.startswith(f'{job_id}.'):
+                    os.remove(os.path.join(settings.JOBS_DIR, name))
+
+
+def submit(files, days, pipeline):
+    """
+    Queue a job running `pipeline(paths, days, target, progress)` on the uploaded `files` (field name -> file),
+    unless the same job is already queued, running or done. Returns the id of the job.
+    A job that failed or stopped is run again.
+
+    `pipeline` gets the paths of the saved files (field name -> path), writes its result to `target`,
+    calls `progress(stage)` when it reaches one of `STAGES` and returns the file name of the result.
+    """
+    purge_expired()
+    job_id = get_job_id(files, days)
+    run = uuid.uuid4().hex
+
+    with closing(_connect()) as connection:
+        # Only one of several identical submissions queues the job
+        connection.execute('BEGIN IMMEDIATE')
+        _fail_stale(connection)
+        row = connection.execute('SELECT stage FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is not None and row['stage'] != 'failed':
+            connection.execute('COMMIT')
+            return job_id
+
+        now = time.time()
+        connection.execute('INSERT OR REPLACE INTO jobs (id, stage, error, filename, created, updated, run) '
+                           'VALUES (?, ?, NULL, NULL, ?, ?, ?)', (job_id, 'queued', now, now, run))
+        connection.execute('COMMIT')
+
+    try:
+        # The uploads only live as long as the request, so they are saved for the worker
+        os.makedirs(input_dir(job_id, run))
+        paths = {}
+        for name, file in files.items():
+            paths[name] = os.path.join(input_dir(job_id, run), file.name)
+            with open(paths[name], 'wb') as saved:
+                for chunk in file.chunks():
+                    saved.write(chunk)
+
+        with _active_lock:
+            _active_runs.add(run)
+        job_pool.submit(_run, job_id, run, paths, days, pipeline)
+    except BaseException:
+        # No job is left queued without a run to move it
+        with _active_lock:
+            _active_runs.discard(run)
+        with closing(_connect()) as connection:
+            connection.execute('DELETE FROM jobs WHERE id = ? AND run = ?', (job_id, run))
+        shutil.rmtree(input_dir(job_id, run), ignore_errors=True)
+        raise
+
+    _start_heartbeat()
+
+    return job_id
+
+
+def _run(job_id, run, paths, days, pipeline):
+    # Written aside, so that a run that was replaced never leaves a partial result
+    target = os.path.join(settings.JOBS_DIR, f'{job_id}.{run}.xlsx')
+
+    with profiling(settings.PROFILE_MEMORY) as profile:
+        try:
+            filename = pipeline(paths, days, target, lambda stage: _update(job_id, run, stage=stage))
+            os.replace(target, result_path(job_id))
+            _update(job_id, run, stage='done', filename=filename)
+        except Exception as error:
+            _update(job_id, run, stage='failed', error=str(error) or type(error).__name__)
+        finally:
+            with _active_lock:
+                _active_runs.discard(run)
+            shutil.rmtree(input_dir(job_id, run), ignore_errors=True)
+            if os.path.exists(target):
+                os.remove(target)
+
+    log_profile(profile, job=job_id)
+
+
+def get_status(job_id):
+    """
+    Stage, progress and result file name of a job, or None when there is no such job
+    """
+    with closing(_connect()) as connection:
+        _fail_stale(connection)
+        row = connection.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+
+    if row is None:
+        return None
+
+    return {
+        'id': row['id'],
+        'stage': row['stage'],
+        'progress': f"{STAGES.index(row['stage'])}/{len(STAGES) - 1}" if row['stage'] in STAGES else None,
+        'error': row['error'],
+        'filename': row['filename'],
+        'expires': row['updated'] + settings.JOB_TTL,
+    }
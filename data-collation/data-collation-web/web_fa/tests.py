@@ -1,3 +1,155 @@
-from django.test import TestCase
+from contextlib import closing
+import io
+import json
+import os
+import tempfile
+import time
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, SimpleTestCase, override_settings
+import numpy as np
+import pandas as pd
+
+from benchmarks.generate import generate_collation
+from web_fa import jobs, views
+
+file_fields = [('gv_file', 'gvSession.xlsx'), ('schedule_file', 'Manage Schedule.xlsx'),
+               ('enrollment_summary_file', 'Enrolment Summary.xlsx')]
+
+
+def wait_for(job_id, timeout=60):
+    deadline = time.time() + timeout
+    status = jobs.get_status(job_id)
+    while status['stage'] not in ('done', 'failed') and time.time() < deadline:
+        time.sleep(0.05)
+        status = jobs.get_status(job_id)
+    return status
+
+
+def write_pipeline(paths, days, target, progress):
+    progress('reading')
+    with open(target, 'wb') as file:
+        file.write(b'result')
+    return 'result.xlsx'
+
+
+class JobsTestCase(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        jobs_settings = override_settings(JOBS_DIR=directory.name)
+        jobs_settings.enable()
+        self.addCleanup(jobs_settings.disable)
+
+
+class JobLifecycleTests(JobsTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        directory = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(directory.cleanup)
+        generate_collation(np.random.default_rng(0), 200, directory.name)
+        cls.exports = {}
+        for field, name in file_fields:
+            with open(os.path.join(directory.name, name), 'rb') as file:
+                cls.exports[field] = (name, file.read())
+
+    def uploads(self):
+        return {field: SimpleUploadedFile(name, content) for field, (name, content) in self.exports.items()}
+
+    def test_submit_status_download(self):
+        client = Client(enforce_csrf_checks=True)
+        # The token comes with the upload form, like for a browser
+        client.get('/')
+        token = client.cookies['csrftoken'].value
+
+        response = client.post('/jobs/', {**self.uploads(), 'days_input': 6}, HTTP_X_CSRFTOKEN=token)
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['id']
+
+        self.assertEqual(wait_for(job_id)['stage'], 'done')
+        status = client.get(response.json()['status_url']).json()
+        self.assertEqual(status['progress'], '4/4')
+
+        download = client.get(status['download_url'])
+        self.assertEqual(download.status_code, 200)
+        result = pd.read_excel(io.BytesIO(b''.join(download.streaming_content)), sheet_name=None)
+
+        # Same workbook as the upload form
+        direct = client.post('/', {**self.uploads(), 'days_input': 6}, HTTP_X_CSRFTOKEN=token)
+        expected = pd.read_excel(io.BytesIO(direct.content), sheet_name=None)
+        self.assertEqual(list(result), ['Sheet1', 'Course > 6 days'])
+        for sheet in expected:
+            pd.testing.assert_frame_equal(result[sheet], expected[sheet])
+
+        # The same files return the same job
+        again = client.post('/jobs/', {**self.uploads(), 'days_input': 6}, HTTP_X_CSRFTOKEN=token)
+        self.assertEqual(again.json()['id'], job_id)
+
+    def test_submit_needs_the_csrf_token(self):
+        response = Client(enforce_csrf_checks=True).post('/jobs/', {**self.uploads(), 'days_input': 6})
+        self.assertEqual(response.status_code, 403)
+
+    def test_unknown_job(self):
+        self.assertEqual(self.client.get('/jobs/unknown/').status_code, 404)
+        self.assertEqual(self.client.get('/jobs/unknown/download/').status_code, 404)
+
+
+class JobRecoveryTests(JobsTestCase):
+    def uploads(self):
+        return {'gv_file': SimpleUploadedFile('gvSession.xlsx', b'sessions')}
+
+    def test_stale_job_is_failed_and_run_again(self):
+        job_id = jobs.submit(self.uploads(), 6, write_pipeline)
+        self.assertEqual(wait_for(job_id)['stage'], 'done')
+
+        # As if the process running the job had stopped while reading
+        with closing(jobs._connect()) as connection:
+            connection.execute("UPDATE jobs SET stage = 'reading', run = 'stopped', updated = ? WHERE id = ?",
+                               (time.time() - 3600, job_id))
+
+        status = jobs.get_status(job_id)
+        self.assertEqual(status['stage'], 'failed')
+        self.assertIn('restarted', status['error'])
+
+        self.assertEqual(jobs.submit(self.uploads(), 6, write_pipeline), job_id)
+        self.assertEqual(wait_for(job_id)['stage'], 'done')
+
+    def test_running_job_is_not_stale(self):
+        with override_settings(JOB_STALE_AFTER=0.2):
+            job_id = jobs.submit(self.uploads(), 6, lambda *args: time.sleep(0.5) or write_pipeline(*args))
+            time.sleep(0.3)
+            self.assertNotEqual(jobs.get_status(job_id)['stage'], 'failed')
+            self.assertEqual(wait_for(job_id)['stage'], 'done')
+
+    def test_failed_save_leaves_no_job(self):
+        class BrokenUpload(SimpleUploadedFile):
+            def chunks(self, chunk_size=None):
+                raise OSError("disk full")
+
+        files = {'gv_file': BrokenUpload('gvSession.xlsx', b'sessions')}
+        job_id = jobs.get_job_id(files, 6)
+        with self.assertRaises(OSError):
+            jobs.submit(files, 6, write_pipeline)
+
+        self.assertIsNone(jobs.get_status(job_id))
+        self.assertEqual(os.listdir(jobs.input_dir(job_id)), [])
+
+
+class CollationConfigTests(SimpleTestCase):
+    def test_edited_config_is_read_again(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'data.json')
+        with open(path, 'w') as file:
+            json.dump({'schools': ['SMU'], 'days': 5}, file)
+
+        with override_settings(COLLATION_CONFIG=path):
+            self.assertEqual(views.get_collation_config(), {'schools': {'SMU'}, 'days': 5})
+
+            with open(path, 'w') as file:
+                json.dump({'schools': ['SMU', 'NUS'], 'days': 7}, file)
+            # A new modification time, even when the file is rewritten within the resolution of the clock
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+            self.assertEqual(views.get_collation_config(), {'schools': {'SMU', 'NUS'}, 'days': 7})
@@ -1,42 +1,25 @@
-import copy
 import datetime as dt
 from django import forms
-from django.http import HttpResponse
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, JsonResponse
 from django.shortcuts import render
+from django.urls import reverse
+import functools
 import io
-import pandas as pd
-import pytz
+import os
 import warnings
 
+from smua_common.workers import new_pool, run_in_pool
+
+from web_fa import jobs
+
 warnings.simplefilter("ignore")
 
-# Define the headers to read in
-session_headers = ['Dept', 'Course Type', 'Sch #', 'Related Schedule #', 'Session #', 'Session Date', 'Session Day', 'S-Time', 'E-Time', 'Venue', 'Lecturer']
-schedule_headers = ['Course Type', 'Sch #', 'Schedule Audience', 'Client Name',
-                          'Course RunID', 'Course Title', 'Sch S-Date', 'Sch E-Date', 'Sch Status', 'Enr Pax']
-enrolment_headers = ["Schedule #", "# Registered"]
-
-# Define new column names for new file
-new_cols = ['Pillar', 'Course No.', 'Course Title', 'Status', 'Course Run ID', 'Mode of Delivery', \
-            'Type of Runs (Public or Corporate)', 'Start Date', 'End Date', 'Session Date & Time', \
-            'Session Venue', 'Losation by Date', 'Total no. of sessions', 'Registered Pax', 'Enrolled Pax',\
-            'Total Pax', 'Venue Category', 'Last Updated']
-
-schools = {
-    "SMU",
-    "SOE",
-    "School of Economics",
-    "YPHSL",
-    "Yong Pung How School of Law",
-    "SOA",
-    "School of Accountancy",
-    "LKCSB",
-    "Lee Kong Chian School of Business",
-    "SMUC",
-    "Connexion",
-    "SCIS",
-    "School of Computing & Information Systems",
-}
+# Threads processing the uploads of `home_async`
+upload_pool = new_pool(settings.UPLOAD_WORKERS, "upload")
+
+# pandas, openpyxl and pytz are imported by the views that process an upload, not at startup:
+# a cold start serving the upload form does not pay for them (see `manage.py importtime`)
 
 class InputForm(forms.Form): 
     gv_file = forms.FileField(label="Upload GV Session Excel sheet")
@@ -44,345 +27,174 @@ class InputForm(forms.Form):
     enrollment_summary_file = forms.FileField(label="Upload Enrollment Summary Excel sheet")
     days_input = forms.IntegerField(min_value=0)
 
+def valid_file_names(input_form):
+    """
+    Check that the uploaded files are the three expected exports
+    """
+    return (
+        input_form.cleaned_data["gv_file"].name == "gvSession.xlsx"
+        and input_form.cleaned_data["schedule_file"].name == "Manage Schedule.xlsx"
+        and input_form.cleaned_data["enrollment_summary_file"].name == "Enrolment Summary.xlsx"
+    )
+
+
 def read_files(input_form):
     """
-    Read excel files and replace empty values with '-'
+    Read the uploaded excel files, when they are the three expected exports
     """
-    gv_file = input_form.cleaned_data["gv_file"]
-    schedule_file = input_form.cleaned_data["schedule_file"]
-    enrollment_summary_file = input_form.cleaned_data["enrollment_summary_file"]
-
-    if (
-        gv_file.name != "gvSession.xlsx"
-        or schedule_file.name != "Manage Schedule.xlsx"
-        or enrollment_summary_file.name != "Enrolment Summary.xlsx"
-    ):
+    if not valid_file_names(input_form):
         return False, None, None, None
     else:
         # Files are valid, continue processing
-        session = pd.read_excel(gv_file, usecols=session_headers).fillna("-")
-        schedule = pd.read_excel(schedule_file, usecols=schedule_headers).fillna("-")
-        enroll = pd.read_excel(enrollment_summary_file, usecols=enrolment_headers).fillna("-")
+        # Workbooks are parsed at the same time when `PARALLEL_WORKBOOK_READS` is set
+        from smua_common.collation.engine import read_exports
+        session, schedule, enroll = read_exports(input_form.cleaned_data["gv_file"],
+                                                 input_form.cleaned_data["schedule_file"],
+                                                 input_form.cleaned_data["enrollment_summary_file"],
+                                                 settings.PARALLEL_WORKBOOK_READS)
 
         return True, session, schedule, enroll
 
 
-def convert_to_dict(session, schedule, enroll):
-    """
-    Convert file from dataframe to JSON key-value pair
-    """
-    session_map = session.to_dict()
-    schedule_map = schedule.set_index("Sch #").T.to_dict()
-    enroll_map = enroll.set_index("Schedule #").T.to_dict()
-
-    return session_map, schedule_map, enroll_map
-
-
-def get_combined_values(session):
+def get_collation_config():
     """
-    Combine values of "Session Date + Session Time" and "Session + Venue"
+    Settings of the collation (`schools`, and the default number of `days`),
+    read again only when the file has changed since the last upload
     """
+    from smua_common.collation import default_config_path
+    path = settings.COLLATION_CONFIG or default_config_path
+    return read_collation_config(path, os.stat(path).st_mtime_ns)
 
-    # combine all the values to form "Session Date + Session Time"
-    session_datetime = session['Session Date'].astype('datetime64[ns]').dt.strftime('%Y-%m-%d') \
-        + ' ' + session['Course Type'].str[0] + session['Session #'].astype(str) \
-        + ' : ' + session['Session Day'] + ' ' \
-        + session['S-Time'] + ' to ' + session['E-Time']
-
-    # combine all the values to form "Session + Venue"
-    session_venue = session['Session Date'].astype('datetime64[ns]').dt.strftime('%Y-%m-%d') \
-        + ' ' + session['Course Type'].str[0] \
-        + session['Session #'].astype(str) + ' - Venue: ' + session['Venue']
 
-    return session_datetime, session_venue
+@functools.lru_cache(maxsize=4)
+def read_collation_config(path, mtime_ns):
+    from smua_common.collation.engine import load_config
+    return load_config(path)
 
 
-def map_sessions(session, session_map):
+def get_output_data(session, schedule, enroll, days):
     """
-    Combine all the values of Session Date Time and Session Venue to a 'key'.
-    Get the pillar of the particular Schedule using the Session.
-    The 'key' will be the 'Sch #'.
+    Sheet1 and the sheet of the courses longer than `days` (given in the form)
     """
-    session_datetime, session_venue = get_combined_values(session)
-
-    name_dict = {'Finance & Technology': 'FIT',
-                 'Human Capital, Management & Leadership': 'HCML',
-                 'Business Management': 'BM',
-                 'Services, Operations and Business Improvement': 'SOBI'}
-
-    sessions_details = {
-        key: {
-            "pillar": None,
-            "assessment": {
-                "datetime": [],
-                "venue": []
-            },
-            "normal": {
-                "datetime": [],
-                "venue": []
-            }
-        } for key in session_map["Sch #"].values()
-    }
-
-    for i in range(len(session)):
-        schedule_no = session_map['Sch #'][i]
+    from smua_common.collation.engine import collate
+    return collate(session, schedule, enroll, {**get_collation_config(), 'days': days})
 
-        if not sessions_details[schedule_no]["pillar"]:
-            dept = name_dict.get(session_map['Dept'][i])
-            if not dept:
-                dept = "No dept"
 
-            sessions_details[schedule_no]["pillar"] = dept
+def get_output_filename():
+    import pytz
+    sg_tz = pytz.timezone('Asia/Singapore')
+    current_datetime = dt.datetime.now(sg_tz).strftime("%Y%m%d_%H%M")
+    # current_datetime = sg_tz.localize(now).strftime("%Y%m%d_%H%M")
+    return f'CDL_{current_datetime}.xlsx'
 
-        if session_map['Course Type'][i] == 'Assessment':
-            schedule_no = session_map['Related Schedule #'][i]
 
-            # Check if the 'Related Schedule #' is in inside the map as key
-            if schedule_no not in sessions_details:
-                continue
-            sessions_details[schedule_no]["assessment"]["datetime"].append(session_datetime[i])
-            sessions_details[schedule_no]["assessment"]["venue"].append(session_venue[i])
-        else:
-            sessions_details[schedule_no]["normal"]["datetime"].append(session_datetime[i])
-            sessions_details[schedule_no]["normal"]["venue"].append(session_venue[i])
+def output_files(data_df, long_period_df, filename, days):
+    from smua_common.collation.engine import write_cdl
+    buf = io.BytesIO()
+    write_cdl(buf, data_df, long_period_df, days)
+    buf.seek(0)
+    
+    response = HttpResponse(buf.getvalue(), content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    response['Content-Disposition'] = f'attachment; filename={filename}'
 
-    return sessions_details
+    return response
 
 
-def get_course_audience(schedule_map):
+def run_job_pipeline(paths, days, target, progress):
     """
-    This function gets course audiences, with a certain formatting.
+    Pipeline of a background job: the same steps as `home`, on the saved uploads
     """
-    course_audience_map = {}
-    for key, value in schedule_map.items():
-        schedule_audience = value['Schedule Audience']
-
-        if schedule_audience == '-':
-            course_audience_map[key] = '-'
-        else:
-            client_name = value['Client Name']
-            if client_name == '-':
-                course_audience_map[key] = schedule_audience
-            else:
-                course_audience_map[key] = value['Schedule Audience'] + " : " + value['Client Name']
+    from smua_common.collation.engine import read_exports, write_cdl
 
-    return course_audience_map
+    progress('reading')
+    session, schedule, enroll = read_exports(paths["gv_file"], paths["schedule_file"], paths["enrollment_summary_file"],
+                                             settings.PARALLEL_WORKBOOK_READS)
 
+    progress('structuring')
+    data_df, long_period_df = get_output_data(session, schedule, enroll, days)
 
-def format_location_by_date(sorted_venue):
-    """
-    This function groups a location by date.
-    The group will use the first date by each location.
-
-    Assumption made: Only 1 location per day for each session.
-    """
-    session_venues_map = {}
-    for session in sorted_venue:
-        parts = session.split("Venue:")
+    progress('writing')
+    write_cdl(target, data_df, long_period_df, days)
 
-        session_date = parts[0].split(" ")[0] 
+    return get_output_filename()
 
-        if session_date in session_venues_map: 
-            continue
 
-        session_venue = parts[1][1:]
-        session_venues_map[session_date] = session_venue
+def home (request):
+    input_form = InputForm()
 
-    res = ""
-    for k, v in session_venues_map.items():
-        res += f'{k} \n{v}\n\n'
+    if request.method == "POST":
+        input_form = InputForm(request.POST, request.FILES)
+        if input_form.is_valid():
+            valid, session, schedule, enroll = read_files(input_form)
+            if not valid:
+                return render(request, 'home.html',{"input_form": input_form, "error_msg": "Please upload files with correct names: `gvSession.xlsx`, `Manage Schedule.xlsx`, `Enrolment Summary.xlsx`"})
+            else:
+                days = input_form.cleaned_data["days_input"]
+                data_df, long_period_df = get_output_data(session, schedule, enroll, days)
+                filename = get_output_filename()
 
-    return res
+                response = output_files(data_df, long_period_df, filename, days)
+                
+                return response
 
 
-def find_venue_type(venue):
-    """
-    Get the venue type based on session's venue
-    """
-    if 'Venue: -' in venue or 'Venue: Cancelled' in venue:
-        return venue.split("Venue:")[0] + '-'
-    elif 'Online' in venue:
-        return venue.split("Venue:")[0] + 'Online'
-    else:
-        for building in schools:
-            if building in venue:
-                return venue.split("Venue:")[0] + 'Onsite'
-        return venue.split("Venue:")[0] + 'Offsite'
+    return render(request, 'home.html', {'input_form': input_form})
 
 
-def change_venue_names(venue):
+async def home_async(request):
     """
-    Replace venue name's shortcut
+    Same as `home`, with the upload processed in the upload pool so that the worker keeps serving other requests
     """
-    venue = venue.replace("SR", " Seminar Room")
-    venue = venue.replace("CR", " Classroom")
-    venue = venue.replace(" SMU ", " ")
-    return venue
+    return await run_in_pool(upload_pool, home, request)
 
 
-def add_total_pax(registered_pax, enr_pax):
-    """
-    Calculate the total pax based on Registered and Enrolled Pax
-    """
-    if registered_pax == '-':
-        if enr_pax == '-':
-            return 0
-        else:
-            return enr_pax
-    else:
-        return enr_pax + registered_pax
+def job_urls(job_id):
+    return {
+        'status_url': reverse('job_status', args=[job_id]),
+        'download_url': reverse('job_download', args=[job_id]),
+    }
 
 
-def structure_data(schedule_map, sessions_details, enroll_map, audience_map):
+def submit_job(request):
     """
-    This function is to structure the data accord to the output.
-    Do note that there are quite a number of data manipulation to get the desired output.
+    Queue the collation of the uploaded files as a background job, and answer with the id and the urls of the job.
+    Like the upload form, it needs the CSRF token of the page: the "Run in the background" button of `home.html` sends it,
+    and scripts get the `csrftoken` cookie from the page and send it back in the `X-CSRFToken` header.
     """
-    res = []
-
-    for key, value in schedule_map.items():
-        if value['Course Type'] == 'Assessment':
-            continue
-
-        if not sessions_details.get(key):
-            continue
-
-        # Extract values
-        pillar = sessions_details.get(key).get('pillar')
-
-        if not pillar:
-            continue
-
-        title = value['Course Title']
-        status = value['Sch Status']
-        runid = value['Course RunID']
-
-        # Join the Normal Session datetime and Assessment Session datetime in order
-        datetime_data = copy.deepcopy(sorted(sessions_details[key]["normal"]["datetime"]))
-        datetime_data.extend(sorted(sessions_details[key]["assessment"]["datetime"]))
-        datetime = " \n".join(datetime_data)
-
-        # Join the Normal Session venue and Assessment Session venue in order
-        venue_data = copy.deepcopy(sorted(sessions_details[key]["normal"]["venue"]))
-        venue_data.extend(sorted(sessions_details[key]["assessment"]["venue"]))
-
-        sorted_venue = []
-        category_venue = []
-
-        for venue in venue_data:
-            if venue == '-':
-                continue
-            category_venue.append(find_venue_type(venue))    # Label venue type
-            sorted_venue.append(change_venue_names(venue))   # Format short forms
-
-        location_by_date = format_location_by_date(sorted_venue)
-        session_venue = " \n".join(sorted_venue)
-        delivery_mode = "F2F" if "Online" not in session_venue else "Online"
-        course_audience = audience_map[key]
-        start_date = value['Sch S-Date'].strftime('%Y-%m-%d')
-        end_date = value['Sch E-Date'].strftime('%Y-%m-%d')
-        no_sessions = f'No. of sessions: {len(sessions_details[key]["normal"]["datetime"])} \
-                        \nNo. of assessments: {len(sessions_details[key]["assessment"]["datetime"])}'
-        enrolled_pax = value['Enr Pax']
-        registered_pax = enroll_map[key]['# Registered'] if key in enroll_map else '-'
-        total_pax = add_total_pax(registered_pax, enrolled_pax)
-
-        data = [pillar, key, title, status, runid, delivery_mode,\
-                course_audience, start_date, end_date, datetime, session_venue,\
-                location_by_date, no_sessions, registered_pax, enrolled_pax, total_pax,\
-                " \n".join(category_venue), f'Last Updated: -']
-
-        res.append(data)
-
-    return res
-
-def find_course_more_than_6days(data, days):
-    res = []
-    for i in range(len(data)):
-        start_date = dt.datetime.strptime(data[i][7], '%Y-%m-%d').date()
-        end_date = dt.datetime.strptime(data[i][8], '%Y-%m-%d').date()
-        
-        # if the course start and end dates are more than 6 days apart, add into list
-        if (end_date - start_date).days > days:
-            res.append(data[i])
-
-    return res
-
-def format_cells(data, workbook, worksheet):
-    normal_text = workbook.add_format({'text_wrap': True})
-    bold_text = workbook.add_format({'text_wrap': True, 'bold': True, 'font_size': 15})
-    header_format = workbook.add_format({'bold': True, 'fg_color': "#ffcccc", 'border': 1, 'font_size': 15})
-
-    # To color the header column and bold it
-    for colno, value in enumerate(data.columns.values):
-        worksheet.write(0, colno, value, header_format)
-
-    worksheet.set_column('A:A', 20, normal_text)
-    worksheet.set_column('B:C', 40, normal_text)
-    worksheet.set_column('D:G', 20, normal_text)
-    worksheet.set_column('H:I', 20, bold_text)
-    worksheet.set_column('J:L', 40, bold_text)
-    worksheet.set_column('K:K', 80, bold_text)
-    worksheet.set_column('M:M', 20, normal_text)
-    worksheet.set_column('N:P', 20, bold_text)
-    worksheet.set_column('Q:R', 20, normal_text)
-
-def output_files(data_df, long_period_df, filename, days):
-    buf = io.BytesIO()
-    writer = pd.ExcelWriter(buf, engine='xlsxwriter')
-    data_df.to_excel(writer, sheet_name='Sheet1', index=False)
-    sheet_name = f'Course > {days} days'
-    long_period_df.to_excel(writer, sheet_name=sheet_name, index=False)
-
-    workbook = writer.book
-
-    worksheet = writer.sheets['Sheet1']
-    format_cells(data_df, workbook, worksheet)
-
-    worksheet = writer.sheets[sheet_name]
-    format_cells(long_period_df, workbook, worksheet)
-
-
-    writer.close()
-    buf.seek(0)
-    
-    response = HttpResponse(buf.getvalue(), content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = f'attachment; filename={filename}'
-
-    return response
+    if request.method != "POST":
+        return JsonResponse({'error': "POST the three Excel files and `days_input`"}, status=405)
 
+    input_form = InputForm(request.POST, request.FILES)
+    if not input_form.is_valid():
+        return JsonResponse({'error': input_form.errors}, status=400)
+    if not valid_file_names(input_form):
+        return JsonResponse({'error': "Please upload files with correct names: `gvSession.xlsx`, `Manage Schedule.xlsx`, `Enrolment Summary.xlsx`"}, status=400)
 
-def home (request):
-    input_form = InputForm()
-
-    if request.method == "POST":
-        input_form = InputForm(request.POST, request.FILES)
-        if input_form.is_valid():
-            valid, session, schedule, enroll = read_files(input_form)
-            if not valid:
-                return render(request, 'home.html',{"input_form": input_form, "error_msg": "Please upload files with correct names: `gvSession.xlsx`, `Manage Schedule.xlsx`, `Enrolment Summary.xlsx`"})
-            else:
-                days = input_form.cleaned_data["days_input"]
-                session_map, schedule_map, enroll_map = convert_to_dict(session, schedule, enroll)
-                sessions_details = map_sessions(session, session_map)
-                audience_map = get_course_audience(schedule_map)
+    files = {name: input_form.cleaned_data[name] for name in ("gv_file", "schedule_file", "enrollment_summary_file")}
+    job_id = jobs.submit(files, input_form.cleaned_data["days_input"], run_job_pipeline)
 
-                data = structure_data(schedule_map, sessions_details, enroll_map, audience_map)
+    return JsonResponse({**jobs.get_status(job_id), **job_urls(job_id)}, status=202)
 
-                sg_tz = pytz.timezone('Asia/Singapore')
-                current_datetime = dt.datetime.now(sg_tz).strftime("%Y%m%d_%H%M")
-                # current_datetime = sg_tz.localize(now).strftime("%Y%m%d_%H%M")
-                filename = f'CDL_{current_datetime}.xlsx'
 
-                data_df = pd.DataFrame(data, columns=new_cols)
-                data_df = data_df.sort_values(by=['Start Date', 'Course No.'])
+def job_status(request, job_id):
+    """
+    Stage and progress of a background job
+    """
+    status = jobs.get_status(job_id)
+    if status is None:
+        return JsonResponse({'error': "No such job (it may have expired)"}, status=404)
 
-                long_period = find_course_more_than_6days(data, days)
-                long_period_df = pd.DataFrame(long_period, columns=new_cols).sort_values(by=['Start Date', 'End Date'])
+    return JsonResponse({**status, **job_urls(job_id)})
 
-                response = output_files(data_df, long_period_df, filename, days)
-                
-                return response
 
+def job_download(request, job_id):
+    """
+    Result of a finished background job
+    """
+    status = jobs.get_status(job_id)
+    if status is None:
+        return JsonResponse({'error': "No such job (it may have expired)"}, status=404)
+    if status['stage'] != 'done':
+        return JsonResponse({**status, 'error': "The job is not done yet"}, status=409)
 
-    return render(request, 'home.html', {'input_form': input_form})
+    return FileResponse(open(jobs.result_path(job_id), 'rb'), as_attachment=True, filename=status['filename'])
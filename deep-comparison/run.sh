@@ -23,7 +23,7 @@ echo "Dependencies installed successfully..."
 echo "Running Python code..."
 
 # Run the Python code
-python ./compare_files.py
+python ./compare_files.py "$@"
 
 # Check if the Python script exited successfully
 if [[ $? -ne 0 ]]; then
@@ -0,0 +1,79 @@
+"""
+Cell-level differences between two CDL snapshots.
+
+Both snapshots are aligned on `Course No.` and every column is compared as a
+whole array, instead of walking nested dictionaries and parsing the paths of
+the differences. The result is a table with one row per changed cell.
+"""
+import numpy as np
+import pandas as pd
+
+# Columns of the table of changed cells
+change_columns = ['Course No.', 'Column', 'Old', 'New']
+
+
+class SnapshotDiff:
+    """
+    Differences between an old and a new snapshot:
+    - `added`: course numbers only found in the new snapshot
+    - `removed`: course numbers only found in the old snapshot
+    - `changes`: one row per changed cell, with its old and new value, in the order of the new snapshot
+    """
+
+    def __init__(self, added, removed, changes):
+        self.added = added
+        self.removed = removed
+        self.changes = changes
+
+    def __repr__(self):
+        return f'SnapshotDiff(added={len(self.added)}, removed={len(self.removed)}, changed cells={len(self.changes)})'
+
+
+def values_equal(old_values, new_values):
+    """
+    Compare two arrays element by element; missing values (NaN) are equal to each other.
+    """
+    equal = np.asarray(old_values == new_values)
+    if equal.shape != old_values.shape:
+        # Arrays of types numpy cannot compare at once (e.g. numbers against strings)
+        equal = np.array([old == new for old, new in zip(old_values, new_values)], dtype=bool)
+
+    return equal | (pd.isna(old_values) & pd.isna(new_values))
+
+
+def diff_tables(old, new, columns):
+    """
+    Compare two `KeyedTable` snapshots keyed by `Course No.` on the given `columns`.
+    """
+    old_positions = old.index.get_indexer(new.index)
+    added = new.index[old_positions < 0]
+    removed = old.index[new.index.get_indexer(old.index) < 0]
+
+    # Rows found in both snapshots, as positions in the new and in the old snapshot
+    common = np.flatnonzero(old_positions >= 0)
+    old_common = old_positions[common]
+
+    parts = []
+    for column_no, column in enumerate(columns):
+        old_values = old.column(column)[old_common]
+        new_values = new.column(column)[common]
+
+        changed = ~values_equal(old_values, new_values)
+        if changed.any():
+            parts.append(pd.DataFrame({
+                'Course No.': new.index[common[changed]],
+                'Column': column,
+                'Old': old_values[changed].astype(object),
+                'New': new_values[changed].astype(object),
+                'position': common[changed],
+                'column_no': column_no,
+            }))
+
+    if parts:
+        changes = pd.concat(parts, ignore_index=True) \
+            .sort_values(['position', 'column_no'], kind='stable')[change_columns] \
+            .reset_index(drop=True)
+    else:
+        changes = pd.DataFrame(columns=change_columns)
+
+    return SnapshotDiff(added, removed, changes)
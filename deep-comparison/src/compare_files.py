@@ -1,10 +1,22 @@
+import argparse
 import copy
 from datetime import datetime as dt
-from deepdiff import DeepDiff as dd
-import openpyxl
-from openpyxl.styles import PatternFill
+import json
 import pandas as pd
 import os
+import sys
+import tempfile
+
+# Shared helpers (`smua_common`) live at the root of the repository
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir)))
+
+from smua_common.excel import bold_text, cdl_columns, cdl_header, normal_text, write_frame
+from smua_common.profiling import profiled, stage, start_profile
+from smua_common.snapshots import read_snapshot, write_snapshot
+from smua_common.table import KeyedTable
+
+from cdl_diff import diff_tables
+from history import course_history, update_history
 
 # headers for reading in values from the original CDL files
 headers = ['Pillar', 'Course No.', 'Course Title', 'Status', 'Course Run ID',\
@@ -15,6 +27,9 @@ headers = ['Pillar', 'Course No.', 'Course Title', 'Status', 'Course Run ID',\
 new_cols = copy.deepcopy(headers)
 new_cols.extend(['Last Updated', "Changes From", "Changes To"])
 
+# Layout of the combined file: the CDL layout, with the `Last Updated` and `Changes` columns
+export_columns = cdl_columns[:-1] + [('Q:Q', 20, normal_text), ('R:R', 20, bold_text), ('S:T', 60, bold_text)]
+
 # get current directory
 path = os.getcwd()
 # get parent directory
@@ -24,111 +39,109 @@ parent_dir = os.path.abspath(os.path.join(path, os.pardir)) + "/"
 # sort them in order
 files = sorted([parent_dir + f for f in os.listdir(parent_dir) if f.startswith('CDL') and f.endswith('.xlsx')])
 files_df = []   # Storing DataFrame of files
-files_dict = [] # Storing Dictionary of files
+files_dict = [] # Storing the rows of files, keyed by `Course No.`
 datetime_now = dt.now().strftime("%Y-%m-%d %H:%M")
 
+# Run metadata of the CDL files (when they were last compared)
+manifest_path = parent_dir + "cdl_manifest.json"
 
-def read_files():
-    """
-        Read files as Dataframe and convert into Dictionary.
-        Stores the result in an array of Dictionary.
-    """
-    for i in files:
-        file_read = pd.read_excel(i, usecols=headers, converters={"Total Pax": int})
-        files_df.append(file_read)
+# Append-only log of the differences between consecutive CDL files (history mode)
+history_log = parent_dir + "cdl_history.jsonl"
 
-    files_dict.append(files_df[0].set_index("Course No.").T.to_dict())
-    files_dict.append(files_df[1].set_index("Course No.").T.to_dict())
 
-def update_files_last_update(datetime_now):
+def read_file(file):
     """
-        Update CDL files with last update time
+        Read a file as Dataframe, from its snapshot when possible.
     """
-    for i in range(len(files_df)):
-        files_df[i].loc[:, ['Last Updated']] = f'Last Updated: {datetime_now}'
+    # Use the binary snapshot of the file when it is up to date, else parse the Excel file
+    file_read = read_snapshot(file, headers)
+    if file_read is None:
+        file_read = pd.read_excel(file, usecols=headers, converters={"Total Pax": int})
+        write_snapshot(file_read, file)
+    else:
+        file_read = file_read.astype({"Total Pax": int})
 
-        writer = pd.ExcelWriter(files[i], engine="xlsxwriter")
-        files_df[i].to_excel(writer, sheet_name='Sheet1', index=False)
+    return file_read
 
-        worksheet = writer.sheets["Sheet1"]
 
-        normal_text = writer.book.add_format({'text_wrap': True})
-        bold_text = writer.book.add_format({'text_wrap': True, 'bold': True, 'font_size': 15})
-        header_format = writer.book.add_format({'bold': True, 'fg_color': "#ffcccc", 'border': 1, 'font_size': 15})
+@profiled(rows=lambda _: sum(len(frame) for frame in files_df))
+def read_files():
+    """
+        Read files as Dataframe (from their snapshots when possible) and index their rows by `Course No.`.
+        Stores the result in an array of KeyedTable.
+    """
+    for i in files:
+        files_df.append(read_file(i))
 
+    with stage('index_rows'):
+        files_dict.append(KeyedTable(files_df[0], "Course No."))
+        files_dict.append(KeyedTable(files_df[1], "Course No."))
 
-        # To color the header column and bold it
-        for colno, value in enumerate(files_df[i].columns.values):
-            worksheet.write(0, colno, value, header_format)
+def read_manifest():
+    """
+        Read the run metadata of the CDL files, keyed by file name
+    """
+    try:
+        with open(manifest_path, 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
 
-        worksheet.set_column('A:A', 20, normal_text)
-        worksheet.set_column('B:C', 40, normal_text)
-        worksheet.set_column('D:G', 20, normal_text)
-        worksheet.set_column('H:I', 20, bold_text)
-        worksheet.set_column('J:L', 40, bold_text)
-        worksheet.set_column('M:M', 20, normal_text)
-        worksheet.set_column('N:P', 20, bold_text)
-        worksheet.set_column('Q:R', 20, normal_text)
 
-        writer.close()
+def update_files_last_update(datetime_now):
+    """
+        Record the last update time of the CDL files in the manifest.
+        The CDL files themselves are only read, never rewritten.
+    """
+    manifest = read_manifest()
+    for file in files:
+        manifest[os.path.basename(file)] = {'Last Updated': datetime_now}
 
+    fd, temp_path = tempfile.mkstemp(dir=parent_dir, suffix='.tmp')
+    with os.fdopen(fd, 'w') as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(temp_path, manifest_path)
 
+
+@profiled(rows=lambda diff: len(diff.changes))
 def check_differences():
     """
         Check the differences between the new and the old files.
-        Record down the modified rows, and note down the newly added rows.
-    """
-    modified_row = {}
-    new_row = {}
-
-    diff = dd(files_dict[0], files_dict[1], ignore_order=True)
-
-    if diff.get('dictionary_item_added'):
-        for str in diff['dictionary_item_added']:
-            course_no = str.split("['")[1].split("']")[0]
-            new_row[course_no] = files_dict[1][course_no]
-
-    if diff.get('values_changed'):
-        for key, value in diff['values_changed'].items():
-            course_no = key.split("']['")[0].split("['")[1]
-            column_key = key.split("']['")[1].split("']")[0]
-            temp = modified_row.get(course_no, [])
-            if temp == []:
-                temp.append(f'{column_key} changed from \n{value["old_value"]}')
-                temp.append(f'{column_key} changed to \n{value["new_value"]}')
-            else:
-                temp[0] += f'\n\n{column_key} changed from \n{value["old_value"]}'
-                temp[1] += f'\n\n{column_key} changed to \n{value["new_value"]}'
-
-            modified_row[course_no] = temp
-    
-    return modified_row, new_row
+        Returns the newly added rows and the modified cells (old and new values), in a `SnapshotDiff`.
+    """
+    return diff_tables(files_dict[0], files_dict[1], [header for header in headers if header != 'Course No.'])
+
+
+def describe_changes(changes):
+    """
+        Describe the modified cells of every row, keyed by `Course No.`
+    """
+    course_no = changes['Course No.']
+    changed_from = changes['Column'] + ' changed from \n' + changes['Old'].map(str)
+    changed_to = changes['Column'] + ' changed to \n' + changes['New'].map(str)
+
+    join = lambda values: '\n\n'.join(values)
+    return changed_from.groupby(course_no, sort=False).agg(join), changed_to.groupby(course_no, sort=False).agg(join)
 
 
-def structure_data(modified_row={}, new_row={}):
+@profiled()
+def structure_data(diff):
     """
         Structure the data according to the format of the original files
     """
-    res = []
-    for k, v in files_dict[1].items():
-        temp = []
-        for header in headers:
-            if header == 'Course No.':
-                temp.append(k)
-            else:
-                temp.append(v[header])
-        if k in new_row:
-            temp.extend([f'Last updated: {datetime_now}', "New Row", "New Row"])
-        elif k not in modified_row:
-            temp.extend([f'Last updated: {datetime_now}', "Not modified", "Not modified"])
-        else:
-            temp.extend([f'Last updated: {datetime_now}', modified_row[k][0], modified_row[k][1]])
-        res.append(temp)
+    data = files_dict[1].to_frame().reset_index()[headers]
+    data['Last Updated'] = f'Last updated: {datetime_now}'
 
-    return res
+    changed_from, changed_to = describe_changes(diff.changes)
+    data['Changes From'] = data['Course No.'].map(changed_from).fillna("Not modified")
+    data['Changes To'] = data['Course No.'].map(changed_to).fillna("Not modified")
+    data.loc[data['Course No.'].isin(diff.added), ['Changes From', 'Changes To']] = "New Row"
 
+    return data
 
-def export_to_file(new_row={}):
+
+@profiled('export', rows=lambda _: len(new_data))
+def export_to_file():
     """
         Export the new data into the file with formatting
     """
@@ -141,65 +154,67 @@ def export_to_file(new_row={}):
     
     export_filename = "Combined_CDL_" + file_names[0] + "-" + file_names[1] + ".xlsx"
 
-    writer = pd.ExcelWriter(parent_dir + export_filename, engine="xlsxwriter")
-    df.to_excel(writer, sheet_name='Sheet1', index=False)
-
-    worksheet = writer.sheets["Sheet1"]
+    # New rows are highlighted
+    write_frame(parent_dir + export_filename, df, cdl_header, export_columns, [('Changes From', "New Row", '#FFCC99')])
 
-    normal_text = writer.book.add_format({'text_wrap': True})
-    bold_text = writer.book.add_format({'text_wrap': True, 'bold': True, 'font_size': 15})
-    header_format = writer.book.add_format({'bold': True, 'fg_color': "#ffcccc", 'border': 1, 'font_size': 15})
 
+def update_history_log():
+    """
+        Log the differences of the CDL files that are not in the history yet, each against the file before it.
+    """
+    try:
+        entries = update_history(history_log, files, lambda file: KeyedTable(read_file(file), "Course No."),
+                                 [header for header in headers if header != 'Course No.'])
+    except FileNotFoundError as error:
+        exit(str(error))
 
-    # To color the header column and bold it
-    for colno, value in enumerate(df.columns.values):
-        worksheet.write(0, colno, value, header_format)
-
-    worksheet.set_column('A:A', 20, normal_text)
-    worksheet.set_column('B:C', 40, normal_text)
-    worksheet.set_column('D:G', 20, normal_text)
-    worksheet.set_column('H:I', 20, bold_text)
-    worksheet.set_column('J:L', 40, bold_text)
-    worksheet.set_column('K:K', 80, bold_text)
-    worksheet.set_column('M:M', 20, normal_text)
-    worksheet.set_column('N:P', 20, bold_text)
-    worksheet.set_column('Q:Q', 20, normal_text)
-    worksheet.set_column('R:R', 20, bold_text)
-    worksheet.set_column('S:T', 60, bold_text)
+    for entry in entries:
+        print(f"{entry['snapshot']}: {len(entry['added'])} added, {len(entry['removed'])} removed, "
+              f"{len(entry['changes'])} cell(s) changed")
+    print(f"{len(entries)} new file(s) logged in {history_log}")
 
-    writer.close()
 
-    wb = openpyxl.load_workbook(filename=parent_dir+export_filename)
-    ws = wb['Sheet1']
-    fill = PatternFill(start_color='FFCC99', end_color='FFCC99', fill_type="solid")
-    for row in ws.iter_rows(min_row=2, values_only=False):
-        cell_value = row[1].value
+def print_course_history(course_no):
+    """
+        Print all the logged changes of one course
+    """
+    events = course_history(history_log, course_no)
+    if not events:
+        print(f"No changes logged for {course_no}")
 
-        # Check if condition is met
-        if cell_value in new_row:
-            for cell in row:
-                cell.fill = fill
-    wb.save(parent_dir + export_filename)
+    for snapshot, event in events:
+        print(f"{snapshot}: {event}")
 
 
 """
     Starting point of the Python code
 """
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare CDL files and highlight the differences.")
+    parser.add_argument("--history", action="store_true",
+                        help="log the differences between every consecutive pair of CDL files instead of comparing 2 files")
+    parser.add_argument("--course", help="print the logged history of one course (by `Course No.`)")
+    parser.add_argument("--profile", action="store_true", help="print the time and memory taken by every stage")
+    args = parser.parse_args()
+    profile = start_profile() if args.profile else None
+
+    if args.history or args.course:
+        if args.history:
+            update_history_log()
+        if args.course:
+            print_course_history(args.course)
+        exit()
+
     if not len(files) == 2:
         exit("There must be exactly 2 Excel files.")
     
     read_files()
 
-    if files_dict[0] != files_dict[1]:
-        modified_row, new_row = check_differences()
-        new_data = structure_data(modified_row, new_row)
-        export_to_file(new_row)
-    else:
-        new_data = files_df[1]
-        new_data['Changes From'] = 'Not modified'
-        new_data['Changes To'] = 'Not modified'
-        new_data['Last Updated'] = f'Last updated: {datetime_now}'
-        export_to_file()
-        
+    diff = check_differences()
+    new_data = structure_data(diff)
+    export_to_file()
+
     update_files_last_update(datetime_now)
+
+    if profile:
+        print(profile.summary())
@@ -0,0 +1,119 @@
+"""
+History of a series of CDL snapshots, kept in an append-only log.
+
+Each line of the log is a JSON object describing one snapshot and its
+differences with the snapshot logged just before it, so new snapshots are
+only compared against the last logged one and old workbooks never need to be
+read again to answer queries on the history.
+"""
+import json
+import math
+import os
+
+import pandas as pd
+
+from cdl_diff import SnapshotDiff, change_columns, diff_tables
+
+
+def _json_value(value):
+    """
+    Convert a cell value into a value that can be written to JSON
+    """
+    if hasattr(value, 'item'):
+        value = value.item()     # numpy scalars
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def read_history(log_path):
+    """
+    Read all the entries of the log, oldest first
+    """
+    if not os.path.exists(log_path):
+        return []
+
+    with open(log_path, 'r') as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def make_entry(snapshot, previous, diff):
+    """
+    Log entry for `snapshot`, compared with the `previous` snapshot (None for the first one)
+    """
+    changes = diff.changes
+    return {
+        'snapshot': snapshot,
+        'previous': previous,
+        'added': [_json_value(course_no) for course_no in diff.added],
+        'removed': [_json_value(course_no) for course_no in diff.removed],
+        'changes': [
+            {'Course No.': _json_value(course_no), 'Column': column, 'Old': _json_value(old), 'New': _json_value(new)}
+            for course_no, column, old, new in zip(changes['Course No.'], changes['Column'], changes['Old'], changes['New'])
+        ],
+    }
+
+
+def update_history(log_path, snapshots, load, columns):
+    """
+    Append the snapshots that are not logged yet to the log.
+    `snapshots` are the paths of the snapshots in chronological order, and `load` reads one of them into a `KeyedTable`.
+    Only the last logged snapshot and the new ones are read.
+    Returns the new log entries.
+    """
+    history = read_history(log_path)
+    names = [os.path.basename(snapshot) for snapshot in snapshots]
+
+    previous = history[-1]['snapshot'] if history else None
+    if previous is None:
+        pending = list(zip(names, snapshots))
+    elif previous in names:
+        pending = list(zip(names, snapshots))[names.index(previous) + 1:]
+    else:
+        raise FileNotFoundError(f"The last logged snapshot `{previous}` is missing, the history cannot be continued: "
+                                f"restore it, or remove `{os.path.basename(log_path)}` to start a new history.")
+
+    if not pending:
+        return []
+
+    previous_table = load(snapshots[names.index(previous)]) if previous else None
+    entries = []
+    with open(log_path, 'a') as file:
+        for name, snapshot in pending:
+            table = load(snapshot)
+            if previous_table is None:
+                # First snapshot of the history: every course is new
+                diff = SnapshotDiff(table.index, table.index[:0], pd.DataFrame(columns=change_columns))
+            else:
+                diff = diff_tables(previous_table, table, columns)
+
+            entry = make_entry(name, previous, diff)
+            file.write(json.dumps(entry) + "\n")
+            file.flush()
+            entries.append(entry)
+
+            previous, previous_table = name, table
+
+    return entries
+
+
+def course_history(log_path, course_no):
+    """
+    All the logged events of one course, oldest first, as (snapshot, description) pairs.
+    Course numbers are compared as text: the log keeps numeric course numbers as numbers.
+    """
+    course_no = str(course_no)
+    events = []
+    for entry in read_history(log_path):
+        snapshot = entry['snapshot']
+        if course_no in map(str, entry['added']):
+            events.append((snapshot, "Added" if entry['previous'] else "First seen"))
+        if course_no in map(str, entry['removed']):
+            events.append((snapshot, "Removed"))
+        for change in entry['changes']:
+            if str(change['Course No.']) == course_no:
+                events.append((snapshot, f"{change['Column']} changed from {change['Old']} to {change['New']}"))
+
+    return events
@@ -0,0 +1,8 @@
+"""
+Helpers shared by the SMUA tools (data collation, deep comparison, booking
+verification and bulk booking rejection).
+
+The command-line scripts add the repository root to `sys.path` to import this
+package; the Django websites, deployed without the rest of the repository,
+install it from the root of the repository (`pyproject.toml`).
+"""
@@ -0,0 +1,50 @@
+"""
+Single-pass expansion of abbreviations (e.g. venue short forms).
+
+All the short forms are compiled into one regex, longest first, so a string
+is scanned once and the longest short form wins wherever several could match
+(e.g. `SCIS1` before `SCIS`). Results are memoized per distinct value, since
+the same venue strings repeat thousands of times in an export; the memo keeps
+the most recently used values only, as the expanders of the websites live as
+long as their process.
+"""
+import functools
+import re
+
+import pandas as pd
+
+
+class AbbreviationExpander:
+    """
+    Replace every short form of `mapping` with its long form in one pass.
+    """
+
+    def __init__(self, mapping, memo_size=4096):
+        self.mapping = dict(mapping)
+
+        # Longest short forms first, so that the longest match wins at every position
+        short_forms = sorted(self.mapping, key=lambda short_form: (-len(short_form), short_form))
+        self.pattern = re.compile('|'.join(map(re.escape, short_forms)))
+        self._expand = functools.lru_cache(maxsize=memo_size)(self._expand_text)
+
+    def _replace(self, match):
+        return self.mapping[match.group()]
+
+    def _expand_text(self, text):
+        return self.pattern.sub(self._replace, text)
+
+    def expand(self, text):
+        """
+        Expand the short forms of a single string.
+        """
+        return self._expand(text)
+
+    def expand_column(self, values):
+        """
+        Expand the short forms of a column (Series or array), once per distinct value.
+        """
+        series = values if isinstance(values, pd.Series) else pd.Series(values, dtype=object)
+        uniques = pd.unique(series)
+        expanded = series.map(dict(zip(uniques, map(self.expand, uniques))))
+
+        return expanded if isinstance(values, pd.Series) else expanded.to_numpy()
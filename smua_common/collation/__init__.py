@@ -0,0 +1,9 @@
+"""
+The C&L data collation, shared by `data-collation/merge_files.py` and the
+data collation website: `engine` runs the whole collation, on top of the
+column-oriented building blocks of `sessions` and `structure`.
+"""
+import os
+
+# Settings of the collation (SMU schools, days of a long course), installed with the package
+default_config_path = os.path.join(os.path.dirname(__file__), 'data.json')
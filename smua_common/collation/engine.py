@@ -0,0 +1,92 @@
+"""
+The C&L data collation, from the three exports to the CDL workbook.
+
+`merge_files.py` and the data collation website (upload and background jobs)
+run the same steps through this module: `read_exports` parses the
+gvSession, Manage Schedule and Enrolment Summary workbooks, `collate` turns
+them into the CDL sheets and `write_cdl` writes the workbook. The settings of
+a collation (the names of the SMU schools and the number of days of a long
+course) come from `smua_common/collation/data.json`, see `load_config`.
+"""
+import json
+
+from smua_common.collation import default_config_path
+from smua_common.collation.structure import format_output_dates, structure_data
+from smua_common.excel import cdl_columns, cdl_header, new_workbook, write_sheet
+from smua_common.parse_cache import parse_cache
+from smua_common.profiling import profiled
+
+# Define the headers to read in
+session_headers = ['Dept', 'Course Type', 'Sch #', 'Related Schedule #', 'Session #',
+                   'Session Date', 'Session Day', 'S-Time', 'E-Time', 'Venue', 'Lecturer']
+schedule_headers = ['Course Type', 'Sch #', 'Schedule Audience', 'Client Name',
+                    'Course RunID', 'Course Title', 'Sch S-Date', 'Sch E-Date', 'Sch Status', 'Enr Pax']
+enrolment_headers = ["Schedule #", "# Registered"]
+
+# Columns of the CDL sheets
+output_columns = ['Pillar', 'Course No.', 'Course Title', 'Status', 'Course Run ID', 'Mode of Delivery',
+                  'Type of Runs (Public or Corporate)', 'Start Date', 'End Date', 'Session Date & Time',
+                  'Session Venue', 'Location by Date', 'Total no. of sessions', 'Registered Pax', 'Enrolled Pax',
+                  'Total Pax', 'Venue Category', 'Last Updated']
+
+
+def load_config(path=default_config_path):
+    """
+    Settings of the collation from a `data.json` file (the one of this package by default):
+    `schools` (names marking a venue as an SMU venue) and `days` (courses lasting longer are listed apart).
+    """
+    with open(path, 'r') as file:
+        data = json.load(file)
+
+    return {'schools': set(data['schools']), 'days': data['days']}
+
+
+@profiled('read_files', rows=lambda frames: len(frames[0]))
+def read_exports(gv_session, manage_schedule, enrolment_summary, parallel=False):
+    """
+    Read the three exports (paths or uploaded files) and replace empty values with '-'.
+    Only the needed columns are kept while streaming through the sheets,
+    and workbooks that were already parsed are loaded from the parse cache.
+    With `parallel`, the workbooks are parsed at the same time in separate processes.
+    """
+    return parse_cache.read_excel_files([
+        (gv_session, session_headers),
+        (manage_schedule, schedule_headers),
+        (enrolment_summary, enrolment_headers),
+    ], parallel=parallel)
+
+
+def find_course_more_than_6days(data, days):
+    """
+    Get the courses whose start and end dates are more than `days` apart
+    """
+    return data[(data['End Date'] - data['Start Date']).dt.days > days]
+
+
+def collate(session, schedule, enroll, config):
+    """
+    Build the CDL sheets from the exports, with the settings of `load_config`.
+
+    Returns the rows of Sheet1, sorted by start date and course, and the courses lasting
+    more than `config['days']`, sorted by start and end date, with their dates formatted.
+    """
+    data = structure_data(session, schedule, enroll, config['schools'], output_columns)
+
+    data_df = format_output_dates(data.sort_values(by=['Start Date', 'Course No.']))
+
+    long_period_df = find_course_more_than_6days(data, config['days']).sort_values(by=['Start Date', 'End Date'])
+    long_period_df = format_output_dates(long_period_df)
+
+    return data_df, long_period_df
+
+
+@profiled('export')
+def write_cdl(target, data_df, long_period_df, days):
+    """
+    Write the CDL workbook (a path or a file-like object): the raw CDL data in Sheet1,
+    and the courses lasting more than `days` in their own sheet
+    """
+    workbook = new_workbook(target)
+    write_sheet(workbook, 'Sheet1', data_df, cdl_header, cdl_columns)
+    write_sheet(workbook, f'Course > {days} days', long_period_df, cdl_header, cdl_columns)
+    workbook.close()
@@ -0,0 +1,73 @@
+"""
+Grouping of gvSession rows by schedule.
+
+Every session row is attached to its schedule (`Sch #`), except Assessment rows
+which are attached to their `Related Schedule #`. The grouping is done with
+column operations and a single groupby instead of a loop over the rows.
+"""
+import pandas as pd
+
+from smua_common.dates import format_dates, parse_dates
+from smua_common.profiling import profiled
+
+# Short names of the pillars, based on the session's department
+pillar_names = {'Finance & Technology': 'FIT',
+                'Human Capital, Management & Leadership': 'HCML',
+                'Business Management': 'BM',
+                'Services, Operations and Business Improvement': 'SOBI'}
+
+
+def get_combined_values(session):
+    """
+    Combine values of "Session Date + Session Time" and "Session + Venue"
+    """
+    session_date = format_dates(parse_dates(session['Session Date']))
+    session_label = session_date + ' ' + session['Course Type'].str[0] + session['Session #'].astype(str)
+
+    # combine all the values to form "Session Date + Session Time"
+    session_datetime = session_label + ' : ' + session['Session Day'] + ' ' \
+        + session['S-Time'] + ' to ' + session['E-Time']
+
+    # combine all the values to form "Session + Venue"
+    session_venue = session_label + ' - Venue: ' + session['Venue']
+
+    return session_datetime, session_venue
+
+
+def get_pillars(session):
+    """
+    Get the pillar of every schedule, using the department of its first session.
+    The result is indexed by 'Sch #', in order of first appearance.
+    """
+    pillar = session['Dept'].map(pillar_names).fillna("No dept")
+
+    return pillar.groupby(session['Sch #'].to_numpy(), sort=False).first()
+
+
+@profiled()
+def get_session_rows(session):
+    """
+    Attach every session to the schedule it belongs to.
+
+    Returns one row per kept session with the effective 'Sch #', an 'Assessment' flag,
+    the combined 'Datetime' and 'Venue' strings and the original 'Raw Venue'.
+    Assessment sessions whose 'Related Schedule #' has no sessions of its own are dropped.
+    """
+    session_datetime, session_venue = get_combined_values(session)
+
+    keys = pd.Index(pd.unique(session['Sch #']))
+    is_assessment = (session['Course Type'] == 'Assessment').to_numpy()
+
+    # Assessment rows are redirected to the schedule they are related to
+    target = keys.get_indexer(session['Sch #'])
+    target[is_assessment] = keys.get_indexer(session['Related Schedule #'][is_assessment])
+    kept = target >= 0
+
+    return pd.DataFrame({
+        'Sch #': keys.take(target[kept]),
+        'Assessment': is_assessment[kept],
+        'Datetime': session_datetime.to_numpy()[kept],
+        'Venue': session_venue.to_numpy()[kept],
+        'Raw Venue': session['Venue'].to_numpy()[kept],
+    })
+
@@ -0,0 +1,155 @@
+"""
+Column-oriented construction of the CDL output.
+
+The schedules, the sessions grouped by schedule and the enrolment summary are
+joined on 'Sch #' as DataFrames, and every output column is computed with
+column expressions instead of building the output row by row.
+"""
+import numpy as np
+import pandas as pd
+
+from smua_common.abbreviations import AbbreviationExpander
+from smua_common.collation.sessions import get_pillars, get_session_rows
+from smua_common.dates import format_dates, parse_dates
+from smua_common.profiling import profiled
+from smua_common.table import KeyedTable
+from smua_common.venues import get_classifier
+
+
+# Venue name's shortcuts and what they are replaced with
+change_venue_names = AbbreviationExpander({"SR": " Seminar Room", "CR": " Classroom", " SMU ": " "})
+
+
+def get_course_audience(schedule):
+    """
+    This function gets course audiences, with a certain formatting.
+    """
+    audience = schedule['Schedule Audience']
+    client = schedule['Client Name']
+
+    with_client = audience.astype(str) + " : " + client.astype(str)
+    course_audience = with_client.mask(client == '-', audience)
+
+    return course_audience.mask(audience == '-', '-')
+
+
+def add_total_pax(registered_pax, enr_pax):
+    """
+    Calculate the total pax based on Registered and Enrolled Pax
+    """
+    registered_missing = registered_pax == '-'
+    enrolled_missing = enr_pax == '-'
+
+    return enr_pax.mask(registered_missing & enrolled_missing, 0) + registered_pax.mask(registered_missing, 0)
+
+
+def join_per_schedule(positions, values, size, separator=" \n"):
+    """
+    Join `values` per schedule, where `positions` gives the schedule of every value.
+    Values keep their order within a schedule; `size` is the number of schedules.
+    """
+    order = np.argsort(positions, kind='stable')
+    positions, values = positions[order], values[order]
+    bounds = np.searchsorted(positions, np.arange(size + 1))
+
+    return [separator.join(values[start:end]) for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def format_location_by_date(positions, venues, size):
+    """
+    This function groups a location by date.
+    The group will use the first date by each location.
+
+    Assumption made: Only 1 location per day for each session.
+    """
+    session_date = venues.str.split(" ").str[0]
+    session_venue = venues.str.split("Venue:").str[1].str[1:]
+
+    first_by_date = ~pd.DataFrame({'position': positions, 'date': session_date.to_numpy()}).duplicated().to_numpy()
+    location = (session_date + ' \n' + session_venue + '\n\n').to_numpy()
+
+    return join_per_schedule(positions[first_by_date], location[first_by_date], size, separator="")
+
+
+@profiled()
+def structure_data(session, schedule, enroll, schools, columns):
+    """
+    This function is to structure the data accord to the output.
+    Do note that there are quite a number of data manipulation to get the desired output.
+
+    Returns a DataFrame with the given `columns`, one row per schedule that has sessions.
+    The start and end dates are datetime64 columns, see `format_output_dates`.
+    """
+    pillars = get_pillars(session)
+    session_rows = get_session_rows(session)
+
+    # One row per 'Sch #' and the '# Registered' of every 'Schedule #'
+    schedule = KeyedTable(schedule, 'Sch #').to_frame()
+    enroll = KeyedTable(enroll, 'Schedule #')
+
+    schedule = schedule[(schedule['Course Type'] != 'Assessment') & schedule.index.isin(pillars.index)]
+    keys = schedule.index
+    size = len(keys)
+
+    # Position of the output row of every session, sessions of skipped schedules are dropped
+    session_rows = session_rows.assign(position=keys.get_indexer(session_rows['Sch #']))
+    session_rows = session_rows[session_rows['position'] >= 0]
+
+    # Normal sessions first, then assessments, both in sorted order
+    datetime_rows = session_rows.sort_values(['Assessment', 'Datetime'])
+    datetime = join_per_schedule(datetime_rows['position'].to_numpy(), datetime_rows['Datetime'].to_numpy(), size)
+
+    venue_rows = session_rows[session_rows['Venue'] != '-'].sort_values(['Assessment', 'Venue'])
+    positions = venue_rows['position'].to_numpy()
+    # Both are computed on the raw venues, which repeat a lot, after the session's date and number
+    label = venue_rows['Venue'].str.split("Venue:").str[0]
+    category = label + get_classifier(schools).classify_column(venue_rows['Raw Venue'])    # Label venue type
+    # The leading space is part of the " SMU " short form
+    venues = label + 'Venue:' + change_venue_names.expand_column(' ' + venue_rows['Raw Venue'])   # Format short forms
+
+    session_venue = pd.Series(join_per_schedule(positions, venues.to_numpy(), size), index=keys)
+    category_venue = join_per_schedule(positions, category.to_numpy(), size)
+    location_by_date = format_location_by_date(positions, venues, size)
+
+    is_assessment = session_rows['Assessment'].to_numpy()
+    no_normal = np.bincount(session_rows['position'].to_numpy()[~is_assessment], minlength=size)
+    no_assessment = np.bincount(session_rows['position'].to_numpy()[is_assessment], minlength=size)
+    no_sessions = [f'No. of sessions: {normal} \nNo. of assessments: {assessment}'
+                   for normal, assessment in zip(no_normal, no_assessment)]
+
+    delivery_mode = session_venue.str.contains("Online", regex=False).map({True: "Online", False: "F2F"})
+
+    registered_pax = pd.Series(enroll.lookup(keys, '# Registered', default='-'), index=keys)
+    enrolled_pax = schedule['Enr Pax']
+
+    values = [
+        pillars.reindex(keys),
+        keys,
+        schedule['Course Title'],
+        schedule['Sch Status'],
+        schedule['Course RunID'],
+        delivery_mode,
+        get_course_audience(schedule),
+        parse_dates(schedule['Sch S-Date']),
+        parse_dates(schedule['Sch E-Date']),
+        datetime,
+        session_venue,
+        location_by_date,
+        no_sessions,
+        registered_pax,
+        enrolled_pax,
+        add_total_pax(registered_pax, enrolled_pax),
+        category_venue,
+        'Last Updated: -',
+    ]
+
+    values = [value.to_numpy() if isinstance(value, pd.Series) else value for value in values]
+
+    return pd.DataFrame(dict(zip(columns, values))).infer_objects()
+
+
+def format_output_dates(data):
+    """
+    Format the start and end dates, kept as datetime64 while structuring and filtering the data, for the output
+    """
+    return data.assign(**{column: format_dates(data[column]) for column in ('Start Date', 'End Date')})
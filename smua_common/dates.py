@@ -0,0 +1,118 @@
+"""
+Parsing and formatting of date and time columns, once per distinct value.
+
+Exports repeat the same few dates and times on thousands of rows, so every
+column is factorized first, its distinct values are parsed (or formatted)
+with whole-column pandas calls, and the result is spread back to the rows.
+Strings are tried against explicit formats first, and only the values none
+of them fit are left to pandas' per-value inference, like `pd.to_datetime`
+on a single value.
+
+Dates are kept as datetime64 and times of day as timedelta64 (since
+midnight), so they can be compared and subtracted as columns; they are only
+turned back into strings when the output is formatted.
+"""
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+
+# Unambiguous date formats found in the exports, tried before pandas' inference
+date_formats = ('%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%d-%b-%Y', '%d %b %Y')
+
+# Time formats found in the exports, tried before pandas' inference
+time_formats = ('%I:%M %p', '%H:%M', '%H:%M:%S')
+
+
+def _as_series(values):
+    return values if isinstance(values, pd.Series) else pd.Series(np.asarray(values))
+
+
+def _spread(values, codes, uniques):
+    """
+    Rows of a column from the values of its distinct values (missing values stay missing)
+    """
+    if not len(uniques):
+        return pd.Series(index=values.index, dtype=uniques.dtype, name=values.name)
+
+    result = pd.Series(uniques.take(np.maximum(codes, 0)), index=values.index, name=values.name)
+    return result.where(codes >= 0)
+
+
+def _parse_distinct(uniques, formats):
+    """
+    Parse distinct values into datetime64: strings with the first of `formats` that fits,
+    everything else one value at a time with pandas' inference
+    """
+    uniques = pd.Series(uniques, dtype=object)
+    parsed = pd.Series(pd.NaT, index=uniques.index, dtype='datetime64[ns]')
+    remaining = np.ones(len(uniques), dtype=bool)
+    is_string = uniques.map(lambda value: isinstance(value, str)).to_numpy(dtype=bool)
+
+    for date_format in formats:
+        todo = remaining & is_string
+        if not todo.any():
+            break
+        attempt = pd.to_datetime(uniques[todo], format=date_format, errors='coerce')
+        parsed[todo] = attempt
+        remaining[todo] = attempt.isna().to_numpy()
+
+    if remaining.any():
+        parsed[remaining] = [pd.to_datetime(value) for value in uniques[remaining]]
+
+    return parsed
+
+
+def parse_dates(values, formats=date_formats):
+    """
+    Parse a column (Series or array) into a datetime64 Series, once per distinct value.
+    """
+    values = _as_series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.astype('datetime64[ns]')
+
+    codes, uniques = pd.factorize(values)
+    parsed = pd.DatetimeIndex(_parse_distinct(uniques, formats))
+
+    return _spread(values, codes, parsed).astype('datetime64[ns]')
+
+
+def parse_times(values, formats=time_formats):
+    """
+    Parse a column (Series or array) of times of day into a timedelta64 Series (time since midnight),
+    once per distinct value.
+    """
+    values = _as_series(values)
+
+    codes, uniques = pd.factorize(values)
+    # `time` cells are parsed from their ISO format
+    uniques = pd.Series(uniques, dtype=object) \
+        .map(lambda value: value.isoformat() if isinstance(value, dt.time) else value)
+    parsed = pd.DatetimeIndex(_parse_distinct(uniques, formats + ('%H:%M:%S.%f',)))
+    parsed = pd.TimedeltaIndex(parsed - parsed.normalize())
+
+    return _spread(values, codes, parsed).astype('timedelta64[ns]')
+
+
+def format_dates(values, date_format='%Y-%m-%d'):
+    """
+    Format a datetime64 column into strings, once per distinct value.
+    """
+    values = _as_series(values)
+
+    codes, uniques = pd.factorize(values)
+    formatted = pd.Index(pd.DatetimeIndex(uniques).strftime(date_format), dtype=object)
+
+    return _spread(values, codes, formatted)
+
+
+def format_times(values, time_format='%I:%M %p'):
+    """
+    Format a timedelta64 column (time since midnight) into strings, once per distinct value.
+    """
+    values = _as_series(values)
+
+    codes, uniques = pd.factorize(values)
+    formatted = pd.Index((pd.Timestamp(0) + pd.TimedeltaIndex(uniques)).strftime(time_format), dtype=object)
+
+    return _spread(values, codes, formatted)
@@ -0,0 +1,112 @@
+"""
+Styled Excel export in a single xlsxwriter pass.
+
+The header format, the column widths and formats and the row highlighting
+are all written together with the data, so a workbook never has to be opened
+again with openpyxl to colour its rows. Rows are highlighted with conditional
+formats on the value of one column, which keeps the column formats of the
+highlighted cells and works in `constant_memory` mode, where rows must be
+written in order and cannot be revisited.
+
+`constant_memory` is off by default; set `SMUA_EXCEL_CONSTANT_MEMORY=True`
+to flush every row to disk as soon as it is written.
+"""
+import datetime as dt
+import os
+
+import xlsxwriter
+import xlsxwriter.utility
+
+constant_memory = os.getenv('SMUA_EXCEL_CONSTANT_MEMORY', 'False') == 'True'
+
+normal_text = {'text_wrap': True}
+bold_text = {'text_wrap': True, 'bold': True, 'font_size': 15}
+
+# Layout of the CDL files
+cdl_header = {'bold': True, 'fg_color': "#ffcccc", 'border': 1, 'font_size': 15}
+cdl_columns = [
+    ('A:A', 20, normal_text),
+    ('B:C', 40, normal_text),
+    ('D:G', 20, normal_text),
+    ('H:I', 20, bold_text),
+    ('J:L', 40, bold_text),
+    ('K:K', 80, bold_text),
+    ('M:M', 20, normal_text),
+    ('N:P', 20, bold_text),
+    ('Q:R', 20, normal_text),
+]
+
+# Same number formats as `pd.ExcelWriter`
+date_format = {'num_format': 'YYYY-MM-DD'}
+datetime_format = {'num_format': 'YYYY-MM-DD HH:MM:SS'}
+
+
+def new_workbook(target, constant_memory=constant_memory):
+    """
+    Create a workbook writing to a path or a file-like object
+    """
+    return xlsxwriter.Workbook(target, {'constant_memory': constant_memory})
+
+
+def _cell_values(frame):
+    """
+    Rows of `frame` as Python values, with the missing values as None
+    """
+    columns = []
+    for column in frame.columns:
+        values = frame[column].astype(object)
+        columns.append(values.where(values.notna(), None).tolist())
+
+    return zip(*columns)
+
+
+def write_sheet(workbook, sheet_name, frame, header_format, columns=(), highlights=()):
+    """
+    Write `frame` to a new sheet of `workbook`, row by row:
+    - the header row in `header_format`
+    - `columns`: (range, width, format) for the widths and formats of the columns, e.g. ('A:A', 20, normal_text)
+    - `highlights`: (column, value, colour) to fill the rows whose `column` equals `value`
+    """
+    worksheet = workbook.add_worksheet(sheet_name)
+    header = workbook.add_format(header_format)
+    dates = workbook.add_format(date_format)
+    datetimes = workbook.add_format(datetime_format)
+
+    for cols, width, properties in columns:
+        worksheet.set_column(cols, width, workbook.add_format(properties))
+
+    for colno, value in enumerate(frame.columns):
+        worksheet.write(0, colno, value, header)
+
+    for rowno, row in enumerate(_cell_values(frame), start=1):
+        for colno, value in enumerate(row):
+            if value is None:
+                continue
+            if isinstance(value, dt.datetime):
+                worksheet.write_datetime(rowno, colno, value, datetimes)
+            elif isinstance(value, dt.date):
+                worksheet.write_datetime(rowno, colno, value, dates)
+            else:
+                worksheet.write(rowno, colno, value)
+
+    if len(frame) and len(frame.columns):
+        last_row, last_col = len(frame), len(frame.columns) - 1
+        for column, value, colour in highlights:
+            letter = xlsxwriter.utility.xl_col_to_name(frame.columns.get_loc(column))
+            criteria = '"' + str(value).replace('"', '""') + '"'
+            worksheet.conditional_format(1, 0, last_row, last_col, {
+                'type': 'formula',
+                'criteria': f'=${letter}2={criteria}',
+                'format': workbook.add_format({'bg_color': colour}),
+            })
+
+    return worksheet
+
+
+def write_frame(target, frame, header_format, columns=(), highlights=(), sheet_name='Sheet1'):
+    """
+    Write `frame` as the only sheet of a new workbook
+    """
+    workbook = new_workbook(target)
+    write_sheet(workbook, sheet_name, frame, header_format, columns, highlights)
+    workbook.close()
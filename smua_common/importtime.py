@@ -0,0 +1,79 @@
+"""
+Cold import time of the websites, measured with `python -X importtime`.
+
+The websites run as serverless functions, so every cold start imports the
+application before serving its first request. `measure_imports` imports the
+modules in a new interpreter with `-X importtime` and parses the time it
+reports for every module: the time of the module itself (`self`) and the time
+including the modules it imported (`cumulative`). The `importtime` management
+command of the websites prints the report and fails when the cold import is
+over its budget.
+"""
+import os
+import re
+import subprocess
+import sys
+
+# import time: self [us] | cumulative | imported package, indented by two spaces per level
+_import_line = re.compile(r'^import time:\s*(\d+) \|\s*(\d+) \|( +)(\S+)$')
+
+
+def parse_importtime(output):
+    """
+    Records (module, depth, self_ms, cumulative_ms) of the `-X importtime` lines of `output`.
+    A module is reported after the modules it imported.
+    """
+    records = []
+    for line in output.splitlines():
+        match = _import_line.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            records.append({'module': module, 'depth': (len(indent) - 1) // 2,
+                            'self_ms': int(self_us) / 1000, 'cumulative_ms': int(cumulative_us) / 1000})
+
+    return records
+
+
+def measure_imports(modules, cwd=None, env=None):
+    """
+    Import `modules` in a new interpreter, as on a cold start, and return the records of `parse_importtime`
+    """
+    code = '; '.join(f'import {module}' for module in modules)
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=cwd,
+                             env={**os.environ, **(env or {})}, capture_output=True, text=True)
+
+    if process.returncode != 0:
+        errors = [line for line in process.stderr.splitlines() if not _import_line.match(line)]
+        raise RuntimeError(f"Importing {', '.join(modules)} failed:\n" + '\n'.join(errors[-20:]))
+
+    return parse_importtime(process.stderr)
+
+
+def total_ms(records):
+    """
+    Time of the whole import: the modules imported at the top level, with everything they imported
+    """
+    return sum(record['cumulative_ms'] for record in records if record['depth'] == 0)
+
+
+def import_report(records, top=15):
+    """
+    Table of the `top` packages taking the most time (the time of all their modules),
+    then of the `top` modules taking the most time with the modules they imported
+    """
+    packages = {}
+    for record in records:
+        package = packages.setdefault(record['module'].split('.')[0], {'self_ms': 0, 'modules': 0})
+        package['self_ms'] += record['self_ms']
+        package['modules'] += 1
+
+    lines = [f"cold import: {total_ms(records):.1f} ms, {len(records)} modules", '',
+             f"{'package':<40}{'modules':>10}{'ms':>12}"]
+    for name, package in sorted(packages.items(), key=lambda item: -item[1]['self_ms'])[:top]:
+        lines.append(f"{name:<40}{package['modules']:>10}{package['self_ms']:>12.1f}")
+
+    lines += ['', f"{'module':<40}{'self ms':>10}{'cumulative ms':>16}"]
+    for record in sorted(records, key=lambda record: -record['cumulative_ms'])[:top]:
+        lines.append(f"{record['module']:<40}{record['self_ms']:>10.1f}{record['cumulative_ms']:>16.1f}")
+
+    return '\n'.join(lines)
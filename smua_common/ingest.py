@@ -0,0 +1,128 @@
+"""
+Streaming ingestion of Excel workbooks.
+
+`pd.read_excel` builds the whole sheet in memory before `usecols` is applied.
+The functions here walk the sheet row by row with openpyxl's read-only mode and
+only keep the requested columns, so peak memory follows the kept columns
+instead of the size of the sheet.
+
+openpyxl parsing is CPU-bound, so several workbooks can also be parsed at the
+same time in a process pool with `read_excel_files`.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import io
+import os
+
+import openpyxl
+import pandas as pd
+
+
+def _find_columns(header_row, usecols):
+    """
+    Map each requested header to its position in the header row, in sheet order.
+    The first occurrence wins when a header is repeated.
+    """
+    positions = {}
+    for idx, name in enumerate(header_row):
+        if name in usecols and name not in positions:
+            positions[name] = idx
+
+    missing = [name for name in usecols if name not in positions]
+    if missing:
+        raise ValueError(f"Usecols do not match columns, columns expected but not found: {missing}")
+
+    # Keep the order of the sheet, as `pd.read_excel` does
+    return sorted((idx, name) for name, idx in positions.items())
+
+
+def _is_empty(value):
+    return value is None or value == ''
+
+
+def read_excel_columns(source, usecols, fill_value="-"):
+    """
+    Read the `usecols` columns of the first sheet of `source` (a path or a file-like object).
+    Values are collected into one list per column while streaming the rows. Like `pd.read_excel`,
+    blank rows are kept (as empty values) except after the last row holding a value in any column.
+
+    Empty cells are replaced with `fill_value` (pass `None` to keep them as NaN).
+    """
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        worksheet = workbook.worksheets[0]
+        # Exported sheets do not always record their dimensions correctly
+        worksheet.reset_dimensions()
+
+        rows = worksheet.iter_rows(values_only=True)
+        header_row = next(rows, None)
+        if header_row is None:
+            raise ValueError("No header row found in the first sheet")
+
+        columns = _find_columns(header_row, usecols)
+        positions = [idx for idx, _ in columns]
+        names = [name for _, name in columns]
+        buffers = [[] for _ in positions]
+        # Blank rows seen since the last row holding a value, in a kept column or not
+        blank_rows = 0
+
+        for row in rows:
+            values = [row[idx] if idx < len(row) else None for idx in positions]
+            if all(_is_empty(value) for value in values) and all(_is_empty(value) for value in row):
+                blank_rows += 1
+                continue
+            for buffer, value in zip(buffers, values):
+                buffer.extend([None] * blank_rows)
+                buffer.append(value)
+            blank_rows = 0
+    finally:
+        workbook.close()
+
+    data = pd.DataFrame(dict(zip(names, buffers)), columns=names)
+
+    if fill_value is not None:
+        data = data.fillna(fill_value)
+
+    return data
+
+
+def _to_picklable(source):
+    """
+    Turn a source into something that can be sent to another process: a path or the file content.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+
+    # Large Django uploads are already stored in a temporary file
+    if hasattr(source, 'temporary_file_path'):
+        return source.temporary_file_path()
+
+    position = source.tell()
+    content = source.read()
+    source.seek(position)
+
+    return content
+
+
+def _read_excel_job(source, usecols, fill_value):
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+
+    return read_excel_columns(source, usecols, fill_value)
+
+
+def read_excel_files(jobs, parallel=False, fill_value="-"):
+    """
+    Read several workbooks, `jobs` being a list of `(source, usecols)`.
+    The frames are returned in the order of `jobs`.
+
+    With `parallel`, each workbook is parsed in its own process, so the wall time
+    is about the one of the slowest workbook instead of the sum of all of them.
+    """
+    if not parallel or len(jobs) < 2:
+        return [read_excel_columns(source, usecols, fill_value) for source, usecols in jobs]
+
+    with ProcessPoolExecutor(max_workers=len(jobs)) as executor:
+        futures = [executor.submit(_read_excel_job, _to_picklable(source), list(usecols), fill_value)
+                   for source, usecols in jobs]
+
+        return [future.result() for future in futures]
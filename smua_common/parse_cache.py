@@ -0,0 +1,213 @@
+"""
+Content-addressed cache of parsed workbooks.
+
+The same `Manage Schedule.xlsx` and `Enrolment Summary.xlsx` are read many
+times a day. The parsed (column-projected) frames are pickled to a local
+directory, keyed by the SHA-256 of the file content and the requested columns,
+so a workbook that did not change is not parsed again. The directory is kept
+under a size budget by removing the least recently used entries.
+
+Entries are unpickled, so the directory must be private: it is created for the
+current user only, and the cache is disabled when someone else owns it or can
+write to it. An entry that cannot be loaded (truncated, or written with another
+version of pandas) is removed and the workbook is parsed again.
+
+Settings (environment variables):
+- `SMUA_CACHE_DIR`: cache directory, defaults to `<tmp>/smua-parse-cache-<user id>`.
+- `SMUA_CACHE_MAX_BYTES`: size budget, defaults to 256 MB; 0 disables the cache.
+"""
+import getpass
+import hashlib
+import json
+import os
+import pickle
+import stat
+import tempfile
+import warnings
+
+from smua_common.ingest import read_excel_columns, read_excel_files
+
+# Bump when the content of the cached frames changes, to ignore older entries
+CACHE_VERSION = 2
+CHUNK_SIZE = 1 << 20
+
+
+def file_digest(source):
+    """
+    SHA-256 of a file given as a path or as a file-like object (e.g. an uploaded file).
+    The position of a file-like object is restored afterwards.
+    """
+    digest = hashlib.sha256()
+
+    if hasattr(source, 'read'):
+        position = source.tell()
+        for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+        source.seek(position)
+    else:
+        with open(source, 'rb') as file:
+            for chunk in iter(lambda: file.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def _user_id():
+    return os.getuid() if hasattr(os, 'getuid') else getpass.getuser()
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class ParseCache:
+    """
+    Size-bounded LRU cache of parsed frames on local disk, with hit/miss counters.
+    """
+
+    def __init__(self, directory=None, max_bytes=None):
+        if directory is None:
+            directory = os.getenv('SMUA_CACHE_DIR') or os.path.join(tempfile.gettempdir(),
+                                                                    f'smua-parse-cache-{_user_id()}')
+        if max_bytes is None:
+            max_bytes = int(os.getenv('SMUA_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._private = None
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0 and self._private_directory()
+
+    def _private_directory(self):
+        """
+        Create the directory for the current user only, and check that nobody else can write to it
+        """
+        if self._private is None:
+            try:
+                os.makedirs(self.directory, mode=0o700, exist_ok=True)
+                info = os.lstat(self.directory)
+                self._private = stat.S_ISDIR(info.st_mode) and (
+                    not hasattr(os, 'getuid') or (info.st_uid == os.getuid() and not info.st_mode & 0o022))
+            except OSError:
+                self._private = False
+
+            if not self._private:
+                warnings.warn(f"The parse cache is disabled: `{self.directory}` is not a directory private to this user")
+
+        return self._private
+
+    def key(self, digest, *params):
+        """
+        Cache key of a file content and the parameters used to parse it.
+        """
+        description = json.dumps([CACHE_VERSION, digest, params], default=str)
+        return hashlib.sha256(description.encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.pkl')
+
+    def get(self, key):
+        """
+        Get a cached frame, or None when it is not cached.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as file:
+                frame = pickle.load(file)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception:
+            # Truncated, or written by other versions of the libraries: parsed again
+            _remove(path)
+            self.misses += 1
+            return None
+
+        # The modification time is used as the last access time for the eviction,
+        # which may have removed the entry in the meantime
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+
+        return frame
+
+    def put(self, key, frame):
+        """
+        Store a frame, then evict the least recently used entries above the size budget.
+        """
+        # Write to a temporary file first, so that a reader never sees a partial entry
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as file:
+            pickle.dump(frame, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, self._path(key))
+
+        self.evict()
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache fits in `max_bytes`.
+        """
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pkl'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            _remove(path)
+            total -= size
+
+    def read_excel_columns(self, source, usecols, fill_value="-"):
+        """
+        Cached version of `smua_common.ingest.read_excel_columns`.
+        """
+        if not self.enabled:
+            return read_excel_columns(source, usecols, fill_value)
+
+        key = self.key(file_digest(source), list(usecols), fill_value)
+        frame = self.get(key)
+
+        if frame is None:
+            frame = read_excel_columns(source, usecols, fill_value)
+            self.put(key, frame)
+
+        return frame
+
+    def read_excel_files(self, jobs, parallel=False, fill_value="-"):
+        """
+        Cached version of `smua_common.ingest.read_excel_files`.
+        Only the workbooks missing from the cache are parsed (in parallel when asked).
+        """
+        if not self.enabled:
+            return read_excel_files(jobs, parallel, fill_value)
+
+        keys = [self.key(file_digest(source), list(usecols), fill_value) for source, usecols in jobs]
+        frames = [self.get(key) for key in keys]
+
+        missing = [idx for idx, frame in enumerate(frames) if frame is None]
+        parsed = read_excel_files([jobs[idx] for idx in missing], parallel, fill_value)
+
+        for idx, frame in zip(missing, parsed):
+            self.put(keys[idx], frame)
+            frames[idx] = frame
+
+        return frames
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+# Cache shared by the tools of this process
+parse_cache = ParseCache()
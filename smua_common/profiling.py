@@ -0,0 +1,234 @@
+"""
+Per-stage timing and memory of the pipelines.
+
+The steps of the tools are wrapped in named stages, with the `stage` context
+manager or the `profiled` decorator. Stages only measure anything inside an
+active profile (`profiling()`, or `start_profile()` for the whole run of a
+script); otherwise they cost a context variable lookup. A profile records the
+wall time, the number of rows and the peak of memory allocated (tracemalloc)
+of every stage, nested stages included, and can be printed as a table
+(`--profile` of the scripts), sent as a `Server-Timing` header or logged as
+one JSON line (`ServerTimingMiddleware` of the websites).
+
+The profile of a request is shared with the threads of `smua_common.workers`,
+but tracemalloc is process-wide: memory peaks are only meaningful when one
+request at a time is traced.
+"""
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import time
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+_current_profile = contextvars.ContextVar('profile', default=None)
+
+
+class Profile:
+    """
+    Stages measured while the profile is active, in the order they finished
+    """
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.stages = []
+        self._open = []
+
+    def _traced_peak(self):
+        return tracemalloc.get_traced_memory()[1] if self.trace_memory and tracemalloc.is_tracing() else 0
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        record = {'stage': name, 'depth': len(self._open), 'rows': None, 'seconds': None, 'peak_mb': None}
+
+        # The peak of the enclosing stage is kept before the peak is reset for this one
+        peak = self._traced_peak()
+        if self._open:
+            self._open[-1]['_peak'] = max(self._open[-1]['_peak'], peak)
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        record['_baseline'] = tracemalloc.get_traced_memory()[0] if self.trace_memory and tracemalloc.is_tracing() else 0
+        record['_peak'] = 0
+
+        self._open.append(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            self._open.pop()
+
+            peak = max(record.pop('_peak'), self._traced_peak())
+            if self.trace_memory and tracemalloc.is_tracing():
+                record['peak_mb'] = (peak - record['_baseline']) / 2 ** 20
+            del record['_baseline']
+            if self._open:
+                self._open[-1]['_peak'] = max(self._open[-1]['_peak'], peak)
+
+            self.stages.append(record)
+
+    def top_level(self):
+        return [record for record in self.stages if record['depth'] == 0]
+
+    def in_start_order(self):
+        """
+        The stages in the order they started, every stage before the stages nested in it
+        """
+        return _in_start_order(self.stages)
+
+    def summary(self):
+        """
+        Table of the stages, nested stages indented under the stage running them
+        """
+        total = sum(record['seconds'] for record in self.top_level()) or 1
+        lines = [f"{'stage':<32}{'rows':>10}{'seconds':>10}{'%':>6}{'peak MB':>10}"]
+
+        # Stages are recorded when they finish, so a stage comes after the stages nested in it
+        for record in self.in_start_order():
+            name = '  ' * record['depth'] + record['stage']
+            rows = '' if record['rows'] is None else record['rows']
+            peak = '' if record['peak_mb'] is None else f"{record['peak_mb']:.1f}"
+            lines.append(f"{name:<32}{rows:>10}{record['seconds']:>10.3f}"
+                         f"{record['seconds'] / total:>6.0%}{peak:>10}")
+
+        return '\n'.join(lines)
+
+    def server_timing(self):
+        """
+        Value of a `Server-Timing` header, with the top-level stages
+        """
+        return ', '.join(f"{record['stage']};dur={record['seconds'] * 1000:.1f}" for record in self.top_level())
+
+    def log_line(self, **fields):
+        """
+        One JSON line with the given fields and every stage
+        """
+        stages = [{key: round(value, 4) if isinstance(value, float) else value for key, value in record.items()}
+                  for record in self.in_start_order()]
+        return json.dumps({**fields, 'stages': stages}, default=str)
+
+
+def log_profile(profile, **fields):
+    """
+    Log the stages of a profile as one JSON line, with the given fields (request, job, ...)
+    """
+    logger.info(profile.log_line(**fields))
+
+
+def _in_start_order(stages):
+    ordered, pending = [], []
+    for record in stages:
+        # The stages nested in this one finished (and were recorded) just before it
+        nested = []
+        while pending and pending[-1][0]['depth'] > record['depth']:
+            nested = pending.pop() + nested
+        pending.append([record] + nested)
+    for group in pending:
+        ordered.extend(group)
+
+    return ordered
+
+
+@contextlib.contextmanager
+def profiling(trace_memory=True):
+    """
+    Profile the stages run in this context (and in the worker threads it starts)
+    """
+    profile = Profile(trace_memory)
+    token = _current_profile.set(profile)
+    started = trace_memory and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+
+    try:
+        yield profile
+    finally:
+        if started:
+            tracemalloc.stop()
+        _current_profile.reset(token)
+
+
+def start_profile(trace_memory=True):
+    """
+    Profile the stages run from now on in this context, e.g. the rest of a script
+    """
+    profile = Profile(trace_memory)
+    _current_profile.set(profile)
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    return profile
+
+
+@contextlib.contextmanager
+def stage(name):
+    """
+    Measure the stage `name` in the active profile, if any.
+    The yielded record can be given the number of `rows` the stage processed.
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        yield {}
+        return
+
+    with profile.stage(name) as record:
+        yield record
+
+
+def profiled(name=None, rows=None):
+    """
+    Decorator measuring every call of a function as a stage (named after the function by default).
+    `rows` gives the number of rows from the result; by default, the length of a result that has one.
+    """
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_profile.get() is None:
+                return func(*args, **kwargs)
+
+            with stage(stage_name) as record:
+                result = func(*args, **kwargs)
+                record['rows'] = rows(result) if rows else _count_rows(result)
+                return result
+
+        return wrapper
+
+    return decorator
+
+
+def _count_rows(result):
+    if isinstance(result, (tuple, str, bytes)) or not hasattr(result, '__len__'):
+        return None
+    return len(result)
+
+
+class ServerTimingMiddleware:
+    """
+    Django middleware profiling every request: the top-level stages go to a `Server-Timing` header,
+    and all the stages to one JSON log line. Memory is traced when the `PROFILE_MEMORY` setting is set.
+    Streamed responses are only measured until the response starts.
+    """
+
+    def __init__(self, get_response):
+        from django.conf import settings
+
+        self.get_response = get_response
+        self.trace_memory = getattr(settings, 'PROFILE_MEMORY', False)
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with profiling(self.trace_memory) as profile:
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+
+        timings = profile.server_timing()
+        response['Server-Timing'] = f"{timings + ', ' if timings else ''}total;dur={total * 1000:.1f}"
+        log_profile(profile, method=request.method, path=request.path, status=response.status_code,
+                    seconds=round(total, 4))
+
+        return response
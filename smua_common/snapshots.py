@@ -0,0 +1,182 @@
+"""
+Binary snapshot sidecars of CDL workbooks.
+
+Next to `CDL_<date>.xlsx`, a `CDL_<date>.xlsx.snapshot` file keeps the parsed
+rows of the workbook together with the SHA-256 of the workbook it was made
+from. Readers load the snapshot instead of parsing the Excel file again, as
+long as the hash still matches; otherwise they fall back to Excel parsing.
+
+Snapshots are NumPy `.npz` archives of plain arrays, read with
+`allow_pickle=False`: loading a snapshot never runs code, whoever wrote the
+file. The `header` member (layout version, SHA-256 of the workbook, columns)
+is checked before any column is read, and only the requested columns are
+read. Object columns, which mix '-' with numbers, dates and text in the CDL
+files, are stored as the type of every cell and one array per type, so they
+come back exactly as Excel parsing returns them.
+"""
+import datetime
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from smua_common.parse_cache import file_digest
+
+# Bump when the layout of the snapshots changes, to ignore older ones
+SNAPSHOT_VERSION = 2
+SNAPSHOT_SUFFIX = '.snapshot'
+
+# Types of the cells of object columns; cells of each type are stored in their own array
+NONE, NAT, STR, BOOL, INT, FLOAT, TIMESTAMP, DATETIME, TIME = range(9)
+
+
+def snapshot_path(workbook_path):
+    return os.fspath(workbook_path) + SNAPSHOT_SUFFIX
+
+
+def as_read_from_excel(frame):
+    """
+    Make a frame look like it does once written to Excel and read back:
+    empty strings become empty cells (NaN) and the index is reset.
+    """
+    return frame.replace('', np.nan).reset_index(drop=True)
+
+
+def _cell_type(value):
+    # bool before int, NaT and Timestamp before datetime: they are subclasses
+    if value is None:
+        return NONE
+    if value is pd.NaT:
+        return NAT
+    if isinstance(value, str):
+        return STR
+    if isinstance(value, (bool, np.bool_)):
+        return BOOL
+    if isinstance(value, (int, np.integer)):
+        return INT
+    if isinstance(value, (float, np.floating)):
+        return FLOAT
+    if isinstance(value, pd.Timestamp):
+        return TIMESTAMP
+    if isinstance(value, datetime.datetime):
+        return DATETIME
+    if isinstance(value, datetime.time):
+        return TIME
+    raise TypeError(f"Cells of type {type(value).__name__} cannot be kept in a snapshot")
+
+
+def _encode_texts(texts):
+    encoded = [text.encode('utf-8') for text in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(text) for text in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def _decode_texts(data, offsets):
+    data = data.tobytes()
+    return [data[start:end].decode('utf-8') for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+
+
+def _encode_column(prefix, values):
+    """
+    Arrays of an object column, named after `prefix`
+    """
+    types = np.array([_cell_type(value) for value in values], dtype=np.uint8)
+    cells = {cell_type: [value for value, value_type in zip(values, types) if value_type == cell_type]
+             for cell_type in np.unique(types).tolist()}
+
+    arrays = {f'{prefix}.types': types}
+    arrays[f'{prefix}.str'], arrays[f'{prefix}.str_offsets'] = _encode_texts(cells.get(STR, []))
+    arrays[f'{prefix}.time'], arrays[f'{prefix}.time_offsets'] = \
+        _encode_texts([value.isoformat() for value in cells.get(TIME, [])])
+    arrays[f'{prefix}.bool'] = np.array(cells.get(BOOL, []), dtype=bool)
+    arrays[f'{prefix}.int'] = np.array(cells.get(INT, []), dtype=np.int64)
+    arrays[f'{prefix}.float'] = np.array(cells.get(FLOAT, []), dtype=np.float64)
+    arrays[f'{prefix}.timestamp'] = np.array([value.value for value in cells.get(TIMESTAMP, [])], dtype=np.int64)
+    arrays[f'{prefix}.datetime'] = np.array([pd.Timestamp(value).value for value in cells.get(DATETIME, [])],
+                                            dtype=np.int64)
+    return arrays
+
+
+def _decode_column(snapshot, prefix):
+    types = snapshot[f'{prefix}.types']
+    cells = {
+        NONE: iter(lambda: None, object()),
+        NAT: iter(lambda: pd.NaT, object()),
+        STR: iter(_decode_texts(snapshot[f'{prefix}.str'], snapshot[f'{prefix}.str_offsets'])),
+        TIME: iter([datetime.time.fromisoformat(value)
+                    for value in _decode_texts(snapshot[f'{prefix}.time'], snapshot[f'{prefix}.time_offsets'])]),
+        BOOL: iter(snapshot[f'{prefix}.bool'].tolist()),
+        INT: iter(snapshot[f'{prefix}.int'].tolist()),
+        FLOAT: iter(snapshot[f'{prefix}.float'].tolist()),
+        TIMESTAMP: iter([pd.Timestamp(value) for value in snapshot[f'{prefix}.timestamp'].tolist()]),
+        DATETIME: iter([pd.Timestamp(value).to_pydatetime() for value in snapshot[f'{prefix}.datetime'].tolist()]),
+    }
+
+    column = np.empty(len(types), dtype=object)
+    column[:] = [next(cells[cell_type]) for cell_type in types.tolist()]
+    return column
+
+
+def write_snapshot(frame, workbook_path, digest=None):
+    """
+    Write the snapshot of a workbook, `frame` being its rows as parsed from Excel.
+    No snapshot is written for a frame holding cells of other types than Excel parsing returns.
+    """
+    if digest is None:
+        digest = file_digest(workbook_path)
+
+    arrays, kinds = {}, []
+    try:
+        for number, column in enumerate(frame.columns):
+            values = frame[column].to_numpy()
+            if values.dtype.kind in 'biufmM':
+                kinds.append('array')
+                arrays[f'{number}.values'] = values
+            else:
+                kinds.append('object')
+                arrays.update(_encode_column(str(number), values))
+    except TypeError:
+        return
+
+    header = {'version': SNAPSHOT_VERSION, 'sha256': digest, 'columns': [str(column) for column in frame.columns],
+              'kinds': kinds}
+
+    path = snapshot_path(workbook_path)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as file:
+        np.savez(file, header=np.array(json.dumps(header)), **arrays)
+    os.replace(temp_path, path)
+
+
+def read_snapshot(workbook_path, columns=None, digest=None):
+    """
+    Load the rows of a workbook from its snapshot, keeping only `columns` when given.
+    Returns None when there is no snapshot, or when it does not match the workbook anymore.
+    """
+    try:
+        with np.load(snapshot_path(workbook_path), allow_pickle=False) as snapshot:
+            header = json.loads(snapshot['header'].item())
+            if header.get('version') != SNAPSHOT_VERSION:
+                return None
+
+            if digest is None:
+                digest = file_digest(workbook_path)
+            if header.get('sha256') != digest:
+                return None
+
+            names = header['columns']
+            if columns is not None and any(column not in names for column in columns):
+                return None
+
+            data = {}
+            for number, (name, kind) in enumerate(zip(names, header['kinds'])):
+                if columns is None or name in columns:
+                    data[name] = snapshot[f'{number}.values'] if kind == 'array' else _decode_column(snapshot, number)
+    except Exception:
+        # Missing, older, truncated or foreign files: the workbook is parsed instead
+        return None
+
+    return pd.DataFrame(data, columns=list(data))
@@ -0,0 +1,119 @@
+"""
+Keyed, column-oriented view of a DataFrame.
+
+`frame.set_index(key).T.to_dict()` transposes the whole frame into object
+dtype and creates one dictionary per row. `KeyedTable` keeps the original
+column arrays and a hash index of the keys instead, so looking up a row or a
+single value is O(1) without copying the data.
+"""
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+
+class Row(Mapping):
+    """
+    Read-only view of one row of a `KeyedTable`, used like the per-row dictionaries of `.T.to_dict()`.
+    """
+
+    __slots__ = ('_arrays', '_position')
+
+    def __init__(self, arrays, position):
+        self._arrays = arrays
+        self._position = position
+
+    def __getitem__(self, column):
+        return self._arrays[column][self._position]
+
+    def __iter__(self):
+        return iter(self._arrays)
+
+    def __len__(self):
+        return len(self._arrays)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class KeyedTable(Mapping):
+    """
+    Mapping of key -> row over the columns of a DataFrame.
+
+    The rows are keyed by the `key` column, or by the index of the frame when `key` is not given.
+    When a key is repeated, the values of its last row are used, like `.T.to_dict()`.
+    """
+
+    def __init__(self, frame, key=None):
+        if key is None:
+            keys = frame.index
+        else:
+            keys = pd.Index(frame[key])
+            frame = frame.drop(columns=key)
+
+        positions = None
+        if not keys.is_unique:
+            codes, keys = pd.factorize(keys, use_na_sentinel=False)
+            positions = np.zeros(len(keys), dtype=np.intp)
+            np.maximum.at(positions, codes, np.arange(len(codes)))
+
+        # `factorize` drops the name of the keys
+        self.index = pd.Index(keys, name=key if key is not None else frame.index.name)
+        self.key = key
+        self._arrays = {}
+        for column in frame.columns:
+            values = frame[column].to_numpy()
+            self._arrays[column] = values if positions is None else values[positions]
+
+    def __getitem__(self, key):
+        return Row(self._arrays, self.index.get_loc(key))
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __repr__(self):
+        return f'KeyedTable({len(self)} rows, columns={self.columns})'
+
+    @property
+    def columns(self):
+        return list(self._arrays)
+
+    def column(self, column):
+        """
+        Get the array of a column, in the order of the keys.
+        """
+        return self._arrays[column]
+
+    def lookup(self, keys, column, default=None):
+        """
+        Get the values of `column` for many keys at once, `default` is used for missing keys.
+        """
+        positions = self.index.get_indexer(keys)
+        found = positions >= 0
+
+        values = np.full(len(positions), default, dtype=object)
+        values[found] = self._arrays[column][positions[found]]
+
+        return values
+
+    def set_column(self, column, values):
+        """
+        Replace (or add) a column, `values` must be in the order of the keys.
+        """
+        values = np.asarray(values, dtype=object) if isinstance(values, list) else np.asarray(values)
+        if len(values) != len(self.index):
+            raise ValueError(f"Expected {len(self.index)} values for column '{column}', got {len(values)}")
+
+        self._arrays[column] = values
+
+    def to_frame(self):
+        """
+        Get the table back as a DataFrame indexed by its keys.
+        """
+        return pd.DataFrame(self._arrays, index=self.index, copy=False)
@@ -0,0 +1,89 @@
+"""
+Substring search of short names (e.g. FBS purposes) in a list of titles.
+
+The titles are joined into one text, and the starting positions of all its
+suffixes are sorted (a suffix array): the suffixes that start with a name,
+i.e. the titles that contain it, form one contiguous range of positions found
+with two binary searches, comparing the name with slices of the text. Only
+integer positions are kept, so the memory used grows linearly with the total
+length of the titles.
+"""
+import bisect
+
+import numpy as np
+
+# Ends every title in the joined text, so that no match runs from one title into the next
+_SEPARATOR = '\0'
+
+
+def _suffix_array(codes):
+    """
+    Positions of the suffixes of `codes` in sorted order, by prefix doubling:
+    each round sorts the suffixes by their first 2k codes, from the ranks of their first k codes.
+    """
+    # Ranks start at 1: 0 stands for the end of the text
+    rank = codes - codes.min() + 1
+    width = 1
+    while True:
+        # Suffixes shorter than `width` sort first, like shorter strings do
+        following = np.zeros(len(rank), dtype=np.int64)
+        following[:-width] = rank[width:]
+        keys = rank * (rank.max() + 1) + following
+        order = np.argsort(keys)
+
+        sorted_keys = keys[order]
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.concatenate(([1], np.cumsum(sorted_keys[1:] != sorted_keys[:-1]) + 1))
+        if rank[order[-1]] == len(order):
+            return order
+        width *= 2
+
+
+class TitleIndex:
+    """
+    Find the first title (in the given order) that contains a name.
+    """
+
+    def __init__(self, titles):
+        # Distinct titles, in order of first appearance
+        self.titles = list(dict.fromkeys(titles))
+
+        self._text = ''.join(title + _SEPARATOR for title in self.titles)
+        lengths = np.array([len(title) + 1 for title in self.titles], dtype=np.int64)
+        # Title number of every position of the text
+        self._owners = np.repeat(np.arange(len(self.titles), dtype=np.int64), lengths)
+
+        codes = np.frombuffer(self._text.encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+        # Each separator gets its own code, below all the characters, so that suffixes never tie across titles
+        separators = np.cumsum(lengths) - 1
+        codes[separators] = -1 - np.arange(len(separators))
+        self._suffixes = _suffix_array(codes) if len(codes) else np.empty(0, dtype=np.int64)
+
+        self._found = {}
+
+    def find(self, name):
+        """
+        First title containing `name`, or None when no title contains it.
+        """
+        if name in self._found:
+            return self._found[name]
+
+        title = None
+        if name == '':
+            # Every title contains the empty string, even an empty title
+            title = self.titles[0] if self.titles else None
+        elif _SEPARATOR in name:
+            title = next((title for title in self.titles if name in title), None)
+        else:
+            text, end = self._text, len(name)
+
+            def prefix(position):
+                return text[position:position + end]
+
+            low = bisect.bisect_left(self._suffixes, name, key=prefix)
+            high = bisect.bisect_right(self._suffixes, name, lo=low, key=prefix)
+            if low < high:
+                title = self.titles[self._owners[self._suffixes[low:high]].min()]
+
+        self._found[name] = title
+        return title
@@ -0,0 +1,60 @@
+"""
+Venue classification into '-', 'Online', 'Onsite' or 'Offsite'.
+
+The school names are compiled once into a single alternation regex, and a
+venue column is classified with one pass over its distinct values. Classifiers
+are cached by their set of schools, so a new one is only built when the list
+of schools (e.g. `data.json`) changes.
+"""
+from functools import lru_cache
+import re
+
+import numpy as np
+import pandas as pd
+
+# A venue that is not set or has been cancelled
+no_venue_pattern = re.compile(r'Venue: (?:-|Cancelled)')
+
+
+class VenueClassifier:
+    """
+    Label venues based on the schools (buildings) that count as onsite.
+    """
+
+    def __init__(self, schools):
+        self.schools = frozenset(schools)
+
+        # Longest names first, so that the longest school name is the one matched
+        names = sorted(self.schools, key=lambda name: (-len(name), name))
+        self.pattern = re.compile('|'.join(map(re.escape, names))) if names else None
+
+    def classify_column(self, venues):
+        """
+        Get the venue type of every venue in the `venues` Series.
+        Each distinct venue is only classified once.
+        """
+        uniques = pd.unique(venues)
+        marked = 'Venue: ' + pd.Series(uniques, dtype=object).astype(str)
+
+        is_online = marked.str.contains('Online', regex=False)
+        if self.pattern is None:
+            is_onsite = pd.Series(False, index=marked.index)
+        else:
+            is_onsite = marked.str.contains(self.pattern)
+
+        labels = np.select([marked.str.contains(no_venue_pattern), is_online, is_onsite],
+                           ['-', 'Online', 'Onsite'], 'Offsite')
+
+        return venues.map(dict(zip(uniques, labels)))
+
+
+@lru_cache(maxsize=8)
+def _get_classifier(schools):
+    return VenueClassifier(schools)
+
+
+def get_classifier(schools):
+    """
+    Get the (cached) classifier of a collection of schools.
+    """
+    return _get_classifier(frozenset(schools))
@@ -0,0 +1,38 @@
+"""
+Offloading of blocking work (pandas, Excel and CSV parsing) from async views.
+
+The async views run the same synchronous pipeline as the regular views in a
+thread pool of a fixed size, so the event loop keeps serving other requests
+while uploads are processed, and no more than `max_workers` of them are
+processed at the same time. Everything a request needs is passed along with
+it; nothing is shared between requests through module state.
+"""
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+
+def new_pool(max_workers, name):
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+
+
+async def run_in_pool(pool, func, *args):
+    """
+    Run `func(*args)` in the pool and wait for its result without blocking the event loop.
+    `func` runs in a copy of the current context, so it sees the profile of the request.
+    """
+    return await asyncio.get_running_loop().run_in_executor(pool, contextvars.copy_context().run, func, *args)
+
+
+async def iterate_in_pool(pool, iterable):
+    """
+    Async iterator over a blocking iterable (e.g. the chunks of a streaming response), advanced in the pool
+    """
+    iterator = iter(iterable)
+    done = object()
+
+    while True:
+        item = await run_in_pool(pool, next, iterator, done)
+        if item is done:
+            return
+        yield item
@@ -0,0 +1,38 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+import pandas as pd
+
+# Shared helpers (`smua_common`) live at the root of the repository
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from smua_common.abbreviations import AbbreviationExpander
+
+
+class AbbreviationExpanderTests(unittest.TestCase):
+    def test_longest_short_form_wins(self):
+        expander = AbbreviationExpander({'SCIS': 'School of Computing', 'SCIS1': 'SCIS Building 1', 'SR': ' Seminar Room'})
+
+        self.assertEqual(expander.expand('SCIS1 SR2-1'), 'SCIS Building 1  Seminar Room2-1')
+        self.assertEqual(expander.expand('SCIS SR'), 'School of Computing  Seminar Room')
+
+    def test_columns(self):
+        expander = AbbreviationExpander({'CR': ' Classroom'})
+        values = ['CR1', '-', 'CR1']
+
+        self.assertEqual(expander.expand_column(pd.Series(values)).tolist(), [' Classroom1', '-', ' Classroom1'])
+        self.assertEqual(expander.expand_column(np.array(values, dtype=object)).tolist(),
+                         [' Classroom1', '-', ' Classroom1'])
+
+    def test_memo_is_bounded(self):
+        expander = AbbreviationExpander({'CR': ' Classroom'}, memo_size=10)
+        for number in range(100):
+            self.assertEqual(expander.expand(f'CR{number}'), f' Classroom{number}')
+
+        self.assertEqual(expander._expand.cache_info().currsize, 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
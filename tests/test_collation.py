@@ -0,0 +1,83 @@
+import os
+import sys
+import unittest
+
+import pandas as pd
+
+# Shared helpers (`smua_common`) live at the root of the repository
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, root)
+
+from smua_common.collation.engine import (collate, enrolment_headers, load_config, output_columns,
+                                          schedule_headers, session_headers)
+
+T = pd.Timestamp
+
+# The exports as read by `read_exports`, empty cells being '-'
+session = pd.DataFrame([
+    ['Human Capital, Management & Leadership', 'Workshop', 101, '-', 1, T('2024-03-05'), 'Tue', '9:00 AM', '5:00 PM',
+     'SMU SOE SR 2-1', 'Tan'],
+    ['Human Capital, Management & Leadership', 'Workshop', 101, '-', 2, T('2024-03-04'), 'Mon', '9:00 AM', '5:00 PM',
+     'SMU SOE SR 2-1', 'Tan'],
+    # Assessments belong to their related schedule, and are dropped when it has no sessions
+    ['Business Management', 'Assessment', 201, 101, 1, T('2024-03-20'), 'Wed', '2:00 PM', '4:00 PM', 'Online Zoom', '-'],
+    ['Finance & Technology', 'Class', 102, '-', 1, T('2024-02-01'), 'Thu', '9:00 AM', '1:00 PM', '-', 'Lim'],
+    ['Other', 'Class', 103, '-', 1, T('2024-02-01'), 'Thu', '2:00 PM', '6:00 PM', 'Marina Bay Sands CR1', 'Ong'],
+    ['Finance & Technology', 'Assessment', 202, 999, 1, T('2024-02-03'), 'Sat', '9:00 AM', '10:00 AM',
+     'SMU LKCSB SR 3-1', '-'],
+    ['Finance & Technology', 'Class', 102, '-', 2, T('2024-02-02'), 'Fri', '9:00 AM', '1:00 PM', 'LKCSB CR 3-2', 'Lim'],
+], columns=session_headers)
+schedule = pd.DataFrame([
+    ['Workshop', 101, 'Public', '-', 'R1', 'Leadership', T('2024-03-04'), T('2024-03-20'), 'Confirmed', 10],
+    ['Class', 102, 'Corporate', 'DBS', 'R2', 'Analytics', T('2024-02-01'), T('2024-02-02'), 'Confirmed', '-'],
+    ['Class', 103, '-', 'X', '-', 'Negotiation', T('2024-02-01'), T('2024-02-01'), 'Tentative', 5],
+    ['Assessment', 201, 'Public', '-', 'R4', 'Leadership Assessment', T('2024-03-20'), T('2024-03-20'), 'Confirmed', 10],
+    ['Class', 104, 'Public', '-', 'R5', 'No sessions', T('2024-04-01'), T('2024-04-02'), 'Confirmed', 1],
+], columns=schedule_headers)
+enroll = pd.DataFrame([[101, 3], [103, '-'], [150, 7]], columns=enrolment_headers)
+
+# Rows of Sheet1 written by `merge_files.py` before the collation engine, for the exports above
+expected_rows = [
+    ['FIT', 102, 'Analytics', 'Confirmed', 'R2', 'F2F', 'Corporate : DBS', '2024-02-01', '2024-02-02',
+     '2024-02-01 C1 : Thu 9:00 AM to 1:00 PM \n2024-02-02 C2 : Fri 9:00 AM to 1:00 PM',
+     '2024-02-01 C1 - Venue: - \n2024-02-02 C2 - Venue: LKCSB  Classroom 3-2',
+     '2024-02-01 \n-\n\n2024-02-02 \nLKCSB  Classroom 3-2\n\n',
+     'No. of sessions: 2 \nNo. of assessments: 0', '-', '-', 0,
+     '2024-02-01 C1 - - \n2024-02-02 C2 - Onsite', 'Last Updated: -'],
+    ['No dept', 103, 'Negotiation', 'Tentative', '-', 'F2F', '-', '2024-02-01', '2024-02-01',
+     '2024-02-01 C1 : Thu 2:00 PM to 6:00 PM',
+     '2024-02-01 C1 - Venue: Marina Bay Sands  Classroom1',
+     '2024-02-01 \nMarina Bay Sands  Classroom1\n\n',
+     'No. of sessions: 1 \nNo. of assessments: 0', '-', 5, 5,
+     '2024-02-01 C1 - Offsite', 'Last Updated: -'],
+    ['HCML', 101, 'Leadership', 'Confirmed', 'R1', 'Online', 'Public', '2024-03-04', '2024-03-20',
+     '2024-03-04 W2 : Mon 9:00 AM to 5:00 PM \n2024-03-05 W1 : Tue 9:00 AM to 5:00 PM \n'
+     '2024-03-20 A1 : Wed 2:00 PM to 4:00 PM',
+     '2024-03-04 W2 - Venue: SOE  Seminar Room 2-1 \n2024-03-05 W1 - Venue: SOE  Seminar Room 2-1 \n'
+     '2024-03-20 A1 - Venue: Online Zoom',
+     '2024-03-04 \nSOE  Seminar Room 2-1\n\n2024-03-05 \nSOE  Seminar Room 2-1\n\n2024-03-20 \nOnline Zoom\n\n',
+     'No. of sessions: 2 \nNo. of assessments: 1', 3, 10, 13,
+     '2024-03-04 W2 - Onsite \n2024-03-05 W1 - Onsite \n2024-03-20 A1 - Online', 'Last Updated: -'],
+]
+
+
+class CollateTests(unittest.TestCase):
+    def setUp(self):
+        self.config = load_config()
+
+    def test_same_rows_as_before(self):
+        data_df, _ = collate(session, schedule, enroll, self.config)
+
+        self.assertEqual(list(data_df.columns), output_columns)
+        self.assertEqual(data_df.to_numpy().tolist(), expected_rows)
+
+    def test_long_courses(self):
+        _, long_period_df = collate(session, schedule, enroll, self.config)
+        self.assertEqual(long_period_df.to_numpy().tolist(), [expected_rows[2]])
+
+        _, long_period_df = collate(session, schedule, enroll, {**self.config, 'days': 0})
+        self.assertEqual(long_period_df['Course No.'].tolist(), [102, 101])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+# The tools and the shared helpers (`smua_common`) live at the root of the repository
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, root)
+
+from benchmarks.generate import generate_cdl, write_excel
+
+cdl_files = ['CDL_20240101_0900.xlsx', 'CDL_20240108_0900.xlsx']
+combined_file = 'Combined_CDL_20240101_0900-20240108_0900.xlsx'
+
+
+def file_hash(path):
+    with open(path, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+class CompareFilesTests(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        generate_cdl(np.random.default_rng(0), 50, self.directory)
+        self.manifest = os.path.join(self.directory, 'cdl_manifest.json')
+
+    def compare(self):
+        # The CDL files are found in the parent of the directory the comparison runs from
+        process = subprocess.run([sys.executable, os.path.join(root, 'deep-comparison', 'src', 'compare_files.py')],
+                                 cwd=os.path.join(self.directory, 'src'), capture_output=True, text=True)
+        self.assertEqual(process.returncode, 0, process.stderr)
+        return pd.read_excel(os.path.join(self.directory, combined_file))
+
+    def test_cdl_files_are_not_rewritten(self):
+        hashes = [file_hash(os.path.join(self.directory, name)) for name in cdl_files]
+        with open(self.manifest, 'w') as file:
+            json.dump({'CDL_20231225_0900.xlsx': {'Last Updated': '2023-12-25 09:00'}}, file)
+
+        combined = self.compare()
+
+        self.assertEqual([file_hash(os.path.join(self.directory, name)) for name in cdl_files], hashes)
+        with open(self.manifest) as file:
+            manifest = json.load(file)
+        self.assertEqual(sorted(manifest), ['CDL_20231225_0900.xlsx'] + cdl_files)
+        self.assertEqual(manifest['CDL_20231225_0900.xlsx'], {'Last Updated': '2023-12-25 09:00'})
+        self.assertEqual(manifest[cdl_files[0]], manifest[cdl_files[1]])
+        self.assertTrue(combined['Last Updated'].str.startswith('Last updated: ').all())
+
+    def test_unreadable_manifest_is_replaced(self):
+        with open(self.manifest, 'w') as file:
+            file.write('{')
+
+        self.compare()
+
+        with open(self.manifest) as file:
+            self.assertEqual(sorted(json.load(file)), cdl_files)
+
+    def test_same_result_from_snapshots(self):
+        first = self.compare()
+        self.assertTrue(all(os.path.exists(os.path.join(self.directory, name + '.snapshot')) for name in cdl_files))
+
+        pd.testing.assert_frame_equal(self.compare().drop(columns='Last Updated'), first.drop(columns='Last Updated'))
+
+    def test_repeated_course_no(self):
+        # The last row of a repeated course is used
+        path = os.path.join(self.directory, cdl_files[1])
+        cdl = pd.read_excel(path)
+        repeated = cdl.iloc[[0]].assign(Status='Postponed')
+        write_excel(pd.concat([cdl, repeated]), path)
+
+        combined = self.compare()
+
+        self.assertEqual(len(combined), len(cdl))
+        course = combined[combined['Course No.'] == repeated['Course No.'].iloc[0]]
+        self.assertEqual(course['Status'].tolist(), ['Postponed'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import pandas as pd
+
+# The tools and the shared helpers (`smua_common`) live at the root of the repository
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, 'deep-comparison', 'src'))
+
+from history import course_history, read_history, update_history
+from smua_common.table import KeyedTable
+
+snapshots = {
+    'CDL_1.xlsx': pd.DataFrame({'Course No.': [100036, 100037], 'Status': ['Confirmed', 'Confirmed']}),
+    'CDL_2.xlsx': pd.DataFrame({'Course No.': [100036, 100038], 'Status': ['Cancelled', 'Confirmed']}),
+}
+
+
+def load(path):
+    return KeyedTable(snapshots[os.path.basename(path)], 'Course No.')
+
+
+class HistoryTests(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.log = os.path.join(directory.name, 'cdl_history.jsonl')
+
+    def test_consecutive_snapshots_are_logged_once(self):
+        entries = update_history(self.log, ['CDL_1.xlsx', 'CDL_2.xlsx'], load, ['Status'])
+
+        self.assertEqual([entry['snapshot'] for entry in entries], ['CDL_1.xlsx', 'CDL_2.xlsx'])
+        self.assertEqual(entries[1]['added'], [100038])
+        self.assertEqual(entries[1]['removed'], [100037])
+        self.assertEqual(update_history(self.log, ['CDL_1.xlsx', 'CDL_2.xlsx'], load, ['Status']), [])
+        self.assertEqual(len(read_history(self.log)), 2)
+
+    def test_course_given_as_text_matches_numeric_course(self):
+        update_history(self.log, ['CDL_1.xlsx', 'CDL_2.xlsx'], load, ['Status'])
+
+        self.assertEqual(course_history(self.log, '100036'), [
+            ('CDL_1.xlsx', "First seen"),
+            ('CDL_2.xlsx', "Status changed from Confirmed to Cancelled"),
+        ])
+        self.assertEqual(course_history(self.log, '100037'), [('CDL_1.xlsx', "First seen"), ('CDL_2.xlsx', "Removed")])
+
+    def test_missing_last_snapshot(self):
+        update_history(self.log, ['CDL_1.xlsx'], load, ['Status'])
+
+        with self.assertRaisesRegex(FileNotFoundError, "CDL_1.xlsx"):
+            update_history(self.log, ['CDL_2.xlsx'], load, ['Status'])
+
+
+if __name__ == '__main__':
+    unittest.main()
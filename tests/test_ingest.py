@@ -0,0 +1,54 @@
+import io
+import os
+import sys
+import unittest
+
+import openpyxl
+import pandas as pd
+
+# Shared helpers (`smua_common`) live at the root of the repository
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from smua_common.ingest import read_excel_columns, read_excel_files
+
+
+def workbook(*rows):
+    book = openpyxl.Workbook()
+    for row in rows:
+        book.active.append(row)
+    content = io.BytesIO()
+    book.save(content)
+    return content.getvalue()
+
+
+class ReadExcelColumnsTests(unittest.TestCase):
+    content = workbook(['Sch #', 'Venue', 'Lecturer'],
+                       [1, 'SR 2-1', 'Tan'],
+                       [None, None, None],
+                       [None, None, 'Lim'],
+                       [2, 'CR 3-1', None],
+                       [None, None, None],
+                       [None, None, 'Ong'],
+                       [None, None, None])
+
+    def test_same_as_read_excel(self):
+        expected = pd.read_excel(io.BytesIO(self.content), usecols=['Venue', 'Sch #']).fillna('-')
+
+        frame = read_excel_columns(io.BytesIO(self.content), ['Venue', 'Sch #'])
+
+        pd.testing.assert_frame_equal(frame, expected)
+        self.assertEqual(len(frame), 6)
+
+    def test_files(self):
+        frames = read_excel_files([(io.BytesIO(self.content), ['Lecturer']), (io.BytesIO(self.content), ['Sch #'])])
+
+        self.assertEqual(frames[0]['Lecturer'].tolist(), ['Tan', '-', 'Lim', '-', '-', 'Ong'])
+        self.assertEqual(list(frames[1].columns), ['Sch #'])
+
+    def test_missing_column(self):
+        with self.assertRaisesRegex(ValueError, 'Dept'):
+            read_excel_columns(io.BytesIO(self.content), ['Sch #', 'Dept'])
+
+
+if __name__ == '__main__':
+    unittest.main()
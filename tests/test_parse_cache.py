@@ -0,0 +1,84 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+import warnings
+
+import pandas as pd
+
+# Shared helpers (`smua_common`) live at the root of the repository
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from smua_common.parse_cache import ParseCache
+
+
+class ParseCacheTests(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.workbook = os.path.join(directory.name, 'Manage Schedule.xlsx')
+        pd.DataFrame({'Sch #': [1, 2], 'Course Title': ['Leadership', None]}).to_excel(self.workbook, index=False)
+
+        self.cache = ParseCache(os.path.join(directory.name, 'cache'))
+
+    def read(self, cache=None):
+        return (cache or self.cache).read_excel_columns(self.workbook, ['Sch #', 'Course Title'])
+
+    def entries(self):
+        return [name for name in os.listdir(self.cache.directory) if name.endswith('.pkl')]
+
+    def test_hit_after_miss(self):
+        first, second = self.read(), self.read()
+
+        pd.testing.assert_frame_equal(first, second)
+        self.assertEqual(self.cache.stats(), {'hits': 1, 'misses': 1})
+        self.assertEqual(os.stat(self.cache.directory).st_mode & 0o777, 0o700)
+
+    def test_changed_workbook_is_parsed_again(self):
+        self.read()
+        pd.DataFrame({'Sch #': [3], 'Course Title': ['Negotiation']}).to_excel(self.workbook, index=False)
+
+        self.assertEqual(self.read()['Sch #'].tolist(), [3])
+        self.assertEqual(self.cache.stats(), {'hits': 0, 'misses': 2})
+
+    def test_unloadable_entry_is_a_miss_and_removed(self):
+        expected = self.read()
+        for content in (b'truncated', b'cno_such_module\nFrame\n.'):
+            [entry] = self.entries()
+            with open(os.path.join(self.cache.directory, entry), 'wb') as file:
+                file.write(content)
+
+            pd.testing.assert_frame_equal(self.read(), expected)
+        self.assertEqual(self.cache.stats(), {'hits': 0, 'misses': 3})
+
+    def test_entry_evicted_while_read(self):
+        self.read()
+        with mock.patch('smua_common.parse_cache.os.utime', side_effect=FileNotFoundError):
+            self.read()
+
+        self.assertEqual(self.cache.hits, 1)
+
+    @unittest.skipUnless(hasattr(os, 'getuid'), "POSIX permissions")
+    def test_shared_directory_disables_the_cache(self):
+        shared = os.path.join(self.directory, 'shared')
+        os.mkdir(shared)
+        os.chmod(shared, 0o777)
+        cache = ParseCache(shared)
+
+        with warnings.catch_warnings(record=True):
+            warnings.simplefilter('always')
+            self.assertFalse(cache.enabled)
+            self.read(cache)
+
+        self.assertEqual(os.listdir(shared), [])
+
+    @unittest.skipUnless(hasattr(os, 'getuid'), "POSIX permissions")
+    def test_default_directory_is_per_user(self):
+        with mock.patch.dict(os.environ, {'SMUA_CACHE_DIR': ''}):
+            self.assertTrue(ParseCache().directory.endswith(f'smua-parse-cache-{os.getuid()}'))
+
+
+if __name__ == '__main__':
+    unittest.main()
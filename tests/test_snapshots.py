@@ -0,0 +1,90 @@
+import datetime
+import os
+import pickle
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+# Shared helpers (`smua_common`) live at the root of the repository
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from smua_common.snapshots import read_snapshot, snapshot_path, write_snapshot
+
+
+class Planted:
+    """
+    Pickled object creating a file when it is unpickled
+    """
+
+    def __init__(self, marker):
+        self.marker = marker
+
+    def __reduce__(self):
+        return open, (self.marker, 'w')
+
+
+def cell_types(frame):
+    return {column: [type(value) for value in frame[column]] for column in frame.columns}
+
+
+class SnapshotTests(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.workbook = os.path.join(directory.name, 'CDL_20240101_0900.xlsx')
+
+        self.frame = pd.DataFrame({
+            'Course No.': [100036, 100037, 100038],
+            'Course Title': ['Data Analytics', 'Négociation – avancé', '-'],
+            'Total Pax': [10, '-', 12.5],
+            'Start Date': [pd.Timestamp('2024-01-05'), '-', datetime.datetime(2024, 2, 1, 9, 30)],
+            'Session Date & Time': ['05 Jan 2024\n9:00 AM', np.nan, None],
+            'Last Updated': [pd.NaT, True, datetime.time(9, 30)],
+            'Enrolled Pax': [1.5, np.nan, 3.0],
+        })
+        self.frame.to_excel(self.workbook, index=False)
+
+    def test_round_trip_keeps_values_and_types(self):
+        write_snapshot(self.frame, self.workbook)
+        snapshot = read_snapshot(self.workbook)
+
+        pd.testing.assert_frame_equal(snapshot, self.frame)
+        self.assertEqual(cell_types(snapshot), cell_types(self.frame))
+
+    def test_round_trip_of_parsed_workbook(self):
+        parsed = pd.read_excel(self.workbook)
+        write_snapshot(parsed, self.workbook)
+
+        pd.testing.assert_frame_equal(read_snapshot(self.workbook), parsed)
+
+    def test_columns(self):
+        write_snapshot(self.frame, self.workbook)
+
+        self.assertEqual(list(read_snapshot(self.workbook, ['Total Pax', 'Course No.']).columns),
+                         ['Course No.', 'Total Pax'])
+        self.assertIsNone(read_snapshot(self.workbook, ['Venue']))
+
+    def test_changed_workbook(self):
+        write_snapshot(self.frame, self.workbook)
+        self.frame.head(1).to_excel(self.workbook, index=False)
+
+        self.assertIsNone(read_snapshot(self.workbook))
+
+    def test_pickle_is_never_loaded(self):
+        marker = os.path.join(self.directory, 'unpickled')
+        with open(snapshot_path(self.workbook), 'wb') as file:
+            pickle.dump({'version': 2, 'frame': Planted(marker)}, file)
+
+        self.assertIsNone(read_snapshot(self.workbook))
+        self.assertFalse(os.path.exists(marker))
+
+    def test_missing_snapshot(self):
+        self.assertIsNone(read_snapshot(self.workbook))
+
+
+if __name__ == '__main__':
+    unittest.main()
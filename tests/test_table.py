@@ -0,0 +1,41 @@
+import os
+import sys
+import unittest
+
+import pandas as pd
+
+# Shared helpers (`smua_common`) live at the root of the repository
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from smua_common.table import KeyedTable
+
+
+class KeyedTableTests(unittest.TestCase):
+    frame = pd.DataFrame({'Course No.': [100036, 100037], 'Status': ['Confirmed', 'Open']})
+
+    def test_rows(self):
+        table = KeyedTable(self.frame, 'Course No.')
+
+        self.assertEqual(dict(table[100037]), {'Status': 'Open'})
+        self.assertNotIn(100038, table)
+        self.assertEqual(table.lookup([100038, 100036], 'Status', default='-').tolist(), ['-', 'Confirmed'])
+
+    def test_repeated_key_keeps_last_row(self):
+        frame = pd.concat([self.frame, pd.DataFrame({'Course No.': [100036], 'Status': ['Cancelled']})])
+        table = KeyedTable(frame, 'Course No.')
+
+        self.assertEqual(len(table), 2)
+        self.assertEqual(dict(table[100036]), {'Status': 'Cancelled'})
+        pd.testing.assert_frame_equal(table.to_frame().reset_index(), pd.DataFrame({
+            'Course No.': [100036, 100037], 'Status': ['Cancelled', 'Open']}))
+
+    def test_keyed_by_index(self):
+        frame = self.frame.set_index('Course No.')
+        repeated = pd.concat([frame, frame])
+
+        self.assertEqual(KeyedTable(frame).index.name, 'Course No.')
+        self.assertEqual(KeyedTable(repeated).index.name, 'Course No.')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import os
+import random
+import sys
+import unittest
+
+# Shared helpers (`smua_common`) live at the root of the repository
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from smua_common.titles import TitleIndex
+
+
+def scan(titles, name):
+    return next((title for title in titles if name in title), None)
+
+
+class TitleIndexTests(unittest.TestCase):
+    titles = ['Data Analytics for Managers', 'Leadership', 'Analytics', '', 'Négociation – avancé', 'Leadership']
+
+    def test_first_title_containing_the_name(self):
+        index = TitleIndex(self.titles)
+
+        self.assertEqual(index.find('Analytics'), 'Data Analytics for Managers')
+        self.assertEqual(index.find('ship'), 'Leadership')
+        self.assertEqual(index.find('avancé'), 'Négociation – avancé')
+        self.assertEqual(index.find(''), 'Data Analytics for Managers')
+        self.assertIsNone(index.find('Managers Leadership'))
+        self.assertIsNone(index.find('Negotiation'))
+        self.assertIsNone(index.find('x\0y'))
+
+    def test_no_titles(self):
+        index = TitleIndex([])
+
+        self.assertIsNone(index.find('Analytics'))
+        self.assertIsNone(index.find(''))
+
+    def test_same_as_scanning_the_titles(self):
+        rng = random.Random(0)
+        titles = [''.join(rng.choice('ab ') for _ in range(rng.randint(0, 12))) for _ in range(300)]
+        index = TitleIndex(titles)
+
+        for _ in range(500):
+            title = rng.choice(titles)
+            start = rng.randint(0, len(title))
+            name = title[start:start + rng.randint(1, 6)] + rng.choice(['', 'a', 'b'])
+            self.assertEqual(index.find(name), scan(titles, name), name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+# Shared helpers (`smua_common`) live at the root of the repository
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, 'verify-bookings'))
+
+from benchmarks.generate import generate_bookings
+from smua_common.table import KeyedTable
+import verify
+
+T = pd.Timestamp
+
+tms_rows = [
+    ['Data Analytics for Managers', T('2024-01-05'), '09:00 AM', '12:00 PM', 'LKCSB Seminar Room 2-1'],
+    ['Data Analytics for Managers', T('2024-01-06'), '09:00 AM', '12:00 PM', 'SOA Seminar Room 3-2'],
+    ['Data Analytics for Managers', T('2024-01-07'), '09:00 AM', '05:00 PM', 'LKCSB Seminar Room 2-1'],
+    ['Data Analytics for Managers', T('2024-01-08'), '09:00 AM', '12:00 PM', 'LKCSB Seminar Room 2-1'],
+    ['Leadership', T('2024-01-05'), '09:00 AM', '12:00 PM', 'LKCSB Seminar Room 2-1'],
+    ['Data Analytics for Managers', T('2024-01-09'), '09:00 AM', '12:00 PM', 'Online Class'],
+    # Only the booking in another venue lasts long enough
+    ['Data Analytics for Managers', T('2024-01-10'), '09:00 AM', '05:00 PM', 'LKCSB Seminar Room 2-1'],
+]
+fbs_rows = [
+    ['LKCSB Seminar Room 2-1', T('2024-01-05'), '08:30', '12:30', 'Tan', 'Data Analytics'],
+    ['LKCSB Seminar Room 2-1', T('2024-01-06'), '08:30', '12:30', 'Tan', 'Data Analytics'],
+    ['LKCSB Seminar Room 2-1', T('2024-01-07'), '08:30', '12:30', 'Tan', 'Data Analytics'],
+    ['LKCSB Seminar Room 2-1', T('2024-01-09'), '08:30', '12:30', 'Tan', 'Data Analytics'],
+    ['LKCSB Seminar Room 2-1', T('2024-01-10'), '08:30', '12:30', 'Tan', 'Data Analytics'],
+    ['SOA Seminar Room 3-2', T('2024-01-10'), '08:00', '18:00', 'Tan', 'Data Analytics'],
+    ['SOA Seminar Room 3-2', T('2024-01-05'), '08:00', '18:00', 'Lim', 'Ad hoc booking'],
+]
+
+
+def mapped_tables(tms, fbs):
+    """
+    Tables as `verify.py` reads and maps them, new ones every time since the mapping changes them
+    """
+    tms, fbs = KeyedTable(tms.copy()), KeyedTable(fbs.copy())
+    verify.fbs_tms_title_mapping(fbs, tms)
+    return tms, fbs
+
+
+def remarks(res):
+    return [row[-1] for row in res]
+
+
+class VerifyBookingsTests(unittest.TestCase):
+    tms = pd.DataFrame(tms_rows, columns=verify.tms_header)
+    fbs = pd.DataFrame(fbs_rows, columns=verify.fbs_header)
+
+    def test_remarks(self):
+        tms, fbs = mapped_tables(self.tms, self.fbs)
+
+        res = verify.verify_bookings(tms, verify.BookingIndex(fbs))
+
+        self.assertEqual(remarks(res), ['Venue matched', 'Venue NOT matched', 'Timing exceeds booking',
+                                        'Booking is missing for this record',
+                                        'Not found in FBS List / Name mismatched', 'No booking needed',
+                                        'Venue NOT matched'])
+        self.assertEqual(res[0][:5], ['Data Analytics for Managers', T('2024-01-05').date(), '09:00 AM', '12:00 PM',
+                                      'Lee Kong Chian School of Business Seminar Room 2-1'])
+
+    def test_vectorized_same_as_per_session(self):
+        tms, fbs = mapped_tables(self.tms, self.fbs)
+
+        per_session = verify.verify_bookings(tms, verify.BookingIndex(fbs))
+
+        self.assertEqual(verify.verify_bookings_vectorized(tms, fbs), per_session)
+
+    def test_vectorized_same_as_per_session_on_generated_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            generate_bookings(np.random.default_rng(0), 500, directory)
+            tms = pd.read_excel(os.path.join(directory, 'TMS.xlsx'), usecols=verify.tms_header).fillna('-')
+            fbs = pd.read_excel(os.path.join(directory, 'FBS.xlsx'), usecols=verify.fbs_header).fillna('-')
+
+        tms, fbs = mapped_tables(tms, fbs)
+        per_session = verify.verify_bookings(tms, verify.BookingIndex(fbs))
+
+        self.assertEqual(verify.verify_bookings_vectorized(tms, fbs), per_session)
+        self.assertGreater(len(set(remarks(per_session))), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,20 @@
-import datetime as dt
-import openpyxl
-from openpyxl.styles import PatternFill
+import argparse
+import bisect
+import itertools
+import numpy as np
 import pandas as pd
 import os
+import sys
+
+# Shared helpers (`smua_common`) live at the root of the repository
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from smua_common.abbreviations import AbbreviationExpander
+from smua_common.dates import format_times, parse_dates, parse_times
+from smua_common.excel import normal_text, write_frame
+from smua_common.profiling import profiled, stage, start_profile
+from smua_common.table import KeyedTable
+from smua_common.titles import TitleIndex
 
 # Define the headers to read in from various files
 fbs_header = ['Facility', 'Booking Date', 'Booking Start Time', 'Booking End Time', 'Booking Owner', 'Purpose']
@@ -12,18 +24,32 @@ tms_header = ['Course Title', 'Session Date', 'S-Time', 'E-Time', 'Venue']
 new_tms_header = tms_header.copy()
 new_tms_header.append('Remarks')
 
+# Formatting of the output file
+output_header = {'bold': True, 'fg_color': "#808080", 'border': 1, 'font_size': 15}
+output_columns = [('A:A', 40, normal_text), ('B:B', 20, normal_text), ('C:D', 10, normal_text), ('E:F', 30, normal_text)]
+
+# Rows are coloured according to their remarks
+remark_highlights = [
+    ('Remarks', 'Venue NOT matched', '#FE8780'),
+    ('Remarks', 'Timing exceeds booking', '#BA92BE'),
+    ('Remarks', 'Booking is missing for this record', '#FCE4D6'),
+    ('Remarks', 'Not found in FBS List / Name mismatched', '#FFD966'),
+]
+
+@profiled(rows=lambda files: len(files[1]) + len(files[2]))
 def read_files():
     """
     Read in files that are starting with `TMS` and `FBS`, and ends with Excel extension
     """
     tms, fbs = {}, {} 
     
-    # Read file that starts with `TMS` and `FBS`, and both are Excel files
+    # Read file that starts with `TMS` and `FBS`, and both are Excel files.
+    # Each record is keyed by its row number.
     for file in os.listdir():
         if (file.startswith("TMS") and file.endswith(".xlsx")):
-            tms = pd.read_excel(file, usecols=tms_header).fillna("-").T.to_dict()
+            tms = KeyedTable(pd.read_excel(file, usecols=tms_header).fillna("-"))
         elif (file.startswith("FBS") and file.endswith(".xlsx")):
-            fbs = pd.read_excel(file, usecols=fbs_header).fillna("-").T.to_dict()
+            fbs = KeyedTable(pd.read_excel(file, usecols=fbs_header).fillna("-"))
 
     # If either of the file is missing, then the code will return "False".
     if not tms or not fbs:
@@ -31,31 +57,20 @@ def read_files():
     else:
         return True, tms, fbs
 
-def change_venue_name(venue):
-    """
-    Utility function to change the venue to long form for standardisation.
-    """
-
-    # Venue mapping to map the different short forms to long forms.
-    venue_mapping = {
-        "Classroom": "Class Room",
-        "SMUC": "SMU Connexion",
-        "SMUA Room 1": "Booking needed!",
-        "YPHSL": "Yong Pung How School of Law",
-        "LKCSB": "Lee Kong Chian School of Business",
-        "SOE/SCIS2": "School of Economics/School of Computing & Information Systems 2",
-        "SOA": "School of Accountancy",
-        "SOSS/CIS": "School of Social Sciences/College of Integrative Studies",
-        "SCIS1": "School of Computing & Information System 1",
-        "SCIS": "School of Computing & Information System 1"
-    }
-
-    # Checks the venue string to see if there are any short forms.
-    # If exists, it will be changed.
-    for short_form, long_form in venue_mapping.items():
-        venue = venue.replace(short_form, long_form)
-
-    return venue
+# Venue mapping to map the different short forms to long forms, for standardisation.
+# The longest short form wins when several match at the same place (e.g. `SCIS1` before `SCIS`).
+change_venue_name = AbbreviationExpander({
+    "Classroom": "Class Room",
+    "SMUC": "SMU Connexion",
+    "SMUA Room 1": "Booking needed!",
+    "YPHSL": "Yong Pung How School of Law",
+    "LKCSB": "Lee Kong Chian School of Business",
+    "SOE/SCIS2": "School of Economics/School of Computing & Information Systems 2",
+    "SOA": "School of Accountancy",
+    "SOSS/CIS": "School of Social Sciences/College of Integrative Studies",
+    "SCIS1": "School of Computing & Information System 1",
+    "SCIS": "School of Computing & Information System 1"
+})
 
 
 def fbs_tms_title_mapping(fbs, tms):
@@ -63,171 +78,235 @@ def fbs_tms_title_mapping(fbs, tms):
     Converts some of the data to be of the same type for easier comparison.
     Mainly, this will be changing the venue names from short form to long form.
     """
-    course_titles = []
+    # Conversion of types of data for standardising and easier comparison
+    # Times are kept as the time since midnight, and dates without their time
+    tms.set_column('S-Time', parse_times(tms.column('S-Time'), ('%I:%M %p',)).to_numpy())
+    tms.set_column('E-Time', parse_times(tms.column('E-Time'), ('%I:%M %p',)).to_numpy())
+    tms.set_column('Session Date', parse_dates(tms.column('Session Date')).dt.normalize().to_numpy())
 
-    for key, item in tms.items():
-        # Conversion of types of data for standardising and easier comparison
-        tms[key]['S-Time'] = dt.datetime.strptime(item['S-Time'], '%I:%M %p').time()
-        tms[key]['E-Time'] = dt.datetime.strptime(item['E-Time'], '%I:%M %p').time()
-        tms[key]['Session Date'] = pd.to_datetime(item['Session Date']).date()
+    # Change venue name from short forms to long forms for standardising
+    tms.set_column('Venue', change_venue_name.expand_column(tms.column('Venue')))
 
-        # Change venue name from short forms to long forms for standardising
-        tms[key]['Venue'] = change_venue_name(item['Venue'])
+    # Index of the course titles, to find the title containing each FBS purpose
+    course_titles = TitleIndex(tms.column('Course Title'))
 
-        if item['Course Title'] not in course_titles:
-            course_titles.append(item['Course Title'])
-    
     # To store the truncated title as key-value pair so that it is easier to map.
     fbs_titles = {}
 
-    for key, item in fbs.items():
-        # Conversion of types of data for standardising and easier comparison
-        fbs[key]['Booking Start Time'] = pd.to_datetime(item['Booking Start Time']).time()
-        fbs[key]['Booking End Time'] = pd.to_datetime(item['Booking End Time']).time()
-        fbs[key]['Booking Date'] = pd.to_datetime(item['Booking Date']).date()
-
-        # Change venue name from short forms to long forms for standardising
-        fbs[key]['Facility'] = change_venue_name(item['Facility'])
+    # Conversion of types of data for standardising and easier comparison
+    fbs.set_column('Booking Start Time', parse_times(fbs.column('Booking Start Time')).to_numpy())
+    fbs.set_column('Booking End Time', parse_times(fbs.column('Booking End Time')).to_numpy())
+    fbs.set_column('Booking Date', parse_dates(fbs.column('Booking Date')).dt.normalize().to_numpy())
 
-        purpose = item['Purpose']
+    # Change venue name from short forms to long forms for standardising
+    fbs.set_column('Facility', change_venue_name.expand_column(fbs.column('Facility')))
 
+    purposes = []
+    for purpose in fbs.column('Purpose'):
         # Checks if the course name has been found before.
         if purpose not in fbs_titles:
-            # Goes through all the different records for the `actual` name of the course to match.
-            for title in course_titles:
-                if purpose in title:
-                    fbs_titles[purpose] = title
-                    fbs[key]['Purpose'] = title
-                    break
-        else:
-            fbs[key]['Purpose'] = fbs_titles.get(purpose)
+            # Looks up the first course title containing the purpose, i.e. the `actual` name of the course.
+            title = course_titles.find(purpose)
+            if title is not None:
+                fbs_titles[purpose] = title
+
+        purposes.append(fbs_titles.get(purpose, purpose))
+
+    fbs.set_column('Purpose', purposes)
 
     return fbs_titles
 
-def verify_bookings(tms, fbs_dict):
+
+class BookingIndex:
+    """
+    FBS bookings grouped by course title and booking date.
+    The bookings of a (title, date) are sorted by start time, together with the latest end time so far,
+    so the bookings containing a session are found with a binary search instead of a scan.
     """
-    Verify the booking records in TMS with the FBS booking; TMS records against FBS booking records.
 
-    It tries to check if the same `Course Name`, then `Session Date`.
-    If a record could be found, it tries to check if the timing is within the timeframe of the booking.
+    def __init__(self, fbs):
+        self._bookings = {}
+        for title, date, start, end, venue in zip(fbs.column('Purpose'), fbs.column('Booking Date'),
+                                                  fbs.column('Booking Start Time'), fbs.column('Booking End Time'),
+                                                  fbs.column('Facility')):
+            self._bookings.setdefault(title, {}).setdefault(date, []).append((start, end, venue))
+
+        for dates in self._bookings.values():
+            for date, bookings in dates.items():
+                bookings.sort(key=lambda booking: booking[0])
+                starts = [booking[0] for booking in bookings]
+                latest_ends = list(itertools.accumulate((booking[1] for booking in bookings), max))
+                dates[date] = (starts, latest_ends, bookings)
+
+    def __contains__(self, title):
+        return title in self._bookings
+
+    def has_date(self, title, date):
+        return date in self._bookings[title]
+
+    def containing(self, title, date, start, end):
+        """
+        Bookings (start, end, venue) of the course on that date, that start before `start` and end after `end`
+        """
+        starts, latest_ends, bookings = self._bookings[title][date]
+
+        # Bookings starting before the session; none of them can contain it if the latest end is too early
+        count = bisect.bisect_right(starts, start)
+        if count == 0 or latest_ends[count - 1] < end:
+            return []
+
+        return [booking for booking in bookings[:count] if booking[1] >= end]
+
+
+def session_remark(bookings, value):
+    """
+    Remark of one TMS session, given the FBS bookings
+    """
+    title = value['Course Title']
+
+    # Cannot find the course name in FBS / the name is mismatched
+    if title not in bookings:
+        return 'Not found in FBS List / Name mismatched'
+
+    # Cannot find the date of this booking
+    if not bookings.has_date(title, value['Session Date']):
+        return 'Booking is missing for this record'
+
+    # Bookings whose start time is earlier or equal to the course start time, and
+    # whose end time is later or equal to the course end time
+    containing = bookings.containing(title, value['Session Date'], value['S-Time'], value['E-Time'])
+
+    # If the start or end time is beyond the booking time
+    if not containing:
+        return 'Timing exceeds booking'
+    # Check TMS venue name against the FBS booking venues for the course and session date
+    if any(venue == value['Venue'] for _, _, venue in containing):
+        return 'Venue matched'
+    # If the venue is Online class
+    if value['Venue'] == 'Online Class':
+        return 'No booking needed'
+    # If the venue is mismatched
+    return 'Venue NOT matched'
+
+
+def session_values(tms):
     """
-    res = []
-
-    # Loops through each TMS record to verify if booking is found or booking in the TMS record is the same as FBS record
-    for value in tms.values():
-        # Gets the `Course Title`
-        key = value.get('Course Title')
-
-        # Preparing the data for output based on TMS values
-        val = [key, value.get('Session Date'), value.get('S-Time').strftime('%I:%M %p'), value.get('E-Time').strftime('%I:%M %p'), value.get('Venue')]
-
-        # Cannot find the course name in FBS / the name is mismatched
-        if key not in fbs_dict:
-            val.append('Not found in FBS List / Name mismatched')
-        else:
-            fbs_value = fbs_dict[key]
-            
-            # Formats the `Session Date` to be string value.
-            session_date = str(value['Session Date'])
-
-            # Cannot find the date of this booking
-            if session_date not in fbs_value:
-                val.append('Booking is missing for this record')
-            else:
-                # Search through the starting time as the start time is not exactly the same for each course.
-                for fbs_start_time, fbs_item in fbs_value[session_date].items():
-
-                    # Check start time earlier or equal to the course start time, and
-                    # check end time is later or equal to the course end time
-                    if fbs_start_time <= str(value['S-Time']) and fbs_item['End'] >= str(value['E-Time']):
-                        # Check TMS venue name against FBS booking venue for the course and session date
-                        if fbs_item['Venue'] == value['Venue']:
-                            val.append('Venue matched')
-                        # If the venue is Online class
-                        elif value['Venue'] == 'Online Class':
-                            val.append('No booking needed')
-                        # If the venue is mismatched
-                        else:
-                            val.append('Venue NOT matched')
-                    # If the start or end time is beyond the booking time
-                    else:
-                        val.append('Timing exceeds booking')
-
-        res.append(val)
+    TMS values of every record for output, with the dates and times formatted back
+    """
+    return [
+        list(values)
+        for values in zip(tms.column('Course Title'), pd.Series(tms.column('Session Date')).dt.date,
+                          format_times(tms.column('S-Time')), format_times(tms.column('E-Time')), tms.column('Venue'))
+    ]
 
-    return res
 
-if __name__ == "__main__":
-    valid, tms, fbs = read_files()
-    if not valid:
-        exit("Files are missing")
+@profiled()
+def verify_bookings(tms, bookings):
+    """
+    Verify the booking records in TMS with the FBS booking; TMS records against FBS booking records.
 
-    # Formats the title and other relevant fields for comparison
-    fbs_titles = fbs_tms_title_mapping(fbs, tms)
+    It tries to check if the same `Course Name`, then `Session Date`.
+    If a record could be found, it tries to check if the timing is within the timeframe of one of the bookings.
+    Every TMS record gets exactly one remark.
+    """
+    res = session_values(tms)
 
-    fbs_dict = {}
+    for val, value in zip(res, tms.values()):
+        val.append(session_remark(bookings, value))
 
-    # Convert to dictionary for easier finding and structure of data
-    for item in fbs.values():
-        title_item = fbs_dict.get(item['Purpose'], {})
-        title_item_start_date = title_item.get(item['Booking Date'], {})
+    return res
 
-        title_item_start_date[str(item['Booking Start Time'])] = {'Venue': item['Facility'], 'End': str(item['Booking End Time'])}
-        title_item[str(item['Booking Date'])] = title_item_start_date
-        fbs_dict[item['Purpose']] = title_item
 
-    # Sort the data to be ascending order, according to the course name
-    fbs_dict = dict(sorted(fbs_dict.items()))
+def seconds_of_day(times):
+    return np.asarray(times).astype('timedelta64[s]').astype(np.int64)
 
-    res = verify_bookings(tms, fbs_dict)
 
-    filename = 'output.xlsx'
+@profiled()
+def verify_bookings_vectorized(tms, fbs):
+    """
+    Same remarks as `verify_bookings`, computed for the whole TMS table at once.
 
-    # -------------- FORMATTING & OUTPUTTING OF DATA ----------------
-    data_df = pd.DataFrame(res, columns=new_tms_header)
+    For every session, `merge_asof` finds the bookings of the same course and date starting before it,
+    and the latest end time of those bookings tells whether one of them contains the session.
+    Doing it again per venue tells whether one of the containing bookings is in the same venue.
+    """
+    sessions = pd.DataFrame({
+        'title': tms.column('Course Title'),
+        'date': tms.column('Session Date'),
+        'venue': tms.column('Venue'),
+        'start': seconds_of_day(tms.column('S-Time')),
+        'end': seconds_of_day(tms.column('E-Time')),
+        'row': np.arange(len(tms)),
+    }).sort_values('start', kind='stable')
+
+    booked = pd.DataFrame({
+        'title': fbs.column('Purpose'),
+        'date': fbs.column('Booking Date'),
+        'venue': fbs.column('Facility'),
+        'start': seconds_of_day(fbs.column('Booking Start Time')),
+        'end': seconds_of_day(fbs.column('Booking End Time')),
+    }).sort_values('start', kind='stable')
+
+    def latest_end(by):
+        # Latest end time of the bookings that start before each session
+        right = booked[by + ['start']].assign(latest_end=booked.groupby(by, sort=False)['end'].cummax())
+        merged = pd.merge_asof(sessions[by + ['start']], right, on='start', by=by, direction='backward')
+        return merged['latest_end'].to_numpy()
+
+    contained = latest_end(['title', 'date']) >= sessions['end'].to_numpy()
+    venue_matched = latest_end(['title', 'date', 'venue']) >= sessions['end'].to_numpy()
+
+    title_found = sessions['title'].isin(booked['title']).to_numpy()
+    date_found = pd.MultiIndex.from_frame(sessions[['title', 'date']]) \
+        .isin(pd.MultiIndex.from_frame(booked[['title', 'date']]))
+
+    remarks = np.select(
+        [~title_found, ~date_found, ~contained, venue_matched, sessions['venue'].to_numpy() == 'Online Class'],
+        ['Not found in FBS List / Name mismatched', 'Booking is missing for this record', 'Timing exceeds booking',
+         'Venue matched', 'No booking needed'],
+        default='Venue NOT matched')
+
+    # Back to the order of the TMS records
+    ordered = np.empty(len(remarks), dtype=object)
+    ordered[sessions['row'].to_numpy()] = remarks
+
+    res = session_values(tms)
+    for val, remark in zip(res, ordered):
+        val.append(remark)
 
-    writer = pd.ExcelWriter(filename, engine="xlsxwriter")
-    data_df.to_excel(writer, sheet_name='Sheet1', index=False)
+    return res
 
-    worksheet = writer.sheets['Sheet1']
 
-    header_format = writer.book.add_format({'bold': True, 'fg_color': "#808080", 'border': 1, 'font_size': 15})
-    normal_text = writer.book.add_format({'text_wrap': True})
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verify the TMS sessions against the FBS bookings.")
+    parser.add_argument("--vectorized", action="store_true",
+                        help="verify all the sessions at once, for large files")
+    parser.add_argument("--profile", action="store_true", help="print the time and memory taken by every stage")
+    args = parser.parse_args()
+    profile = start_profile() if args.profile else None
 
-    # To color the header column and bold it
-    for colno, value in enumerate(data_df.columns.values):
-        worksheet.write(0, colno, value, header_format)
+    valid, tms, fbs = read_files()
+    if not valid:
+        exit("Files are missing")
 
-    worksheet.set_column('A:A', 40, normal_text)
-    worksheet.set_column('B:B', 20, normal_text)
-    worksheet.set_column('C:D', 10, normal_text)
-    worksheet.set_column('E:F', 30, normal_text)
+    # Formats the title and other relevant fields for comparison
+    with stage('fbs_tms_title_mapping') as record:
+        fbs_titles = fbs_tms_title_mapping(fbs, tms)
+        record['rows'] = len(fbs)
+
+    if args.vectorized:
+        res = verify_bookings_vectorized(tms, fbs)
+    else:
+        res = verify_bookings(tms, BookingIndex(fbs))
 
-    writer.close()
+    filename = 'output.xlsx'
 
-    wb = openpyxl.load_workbook(filename)
-    ws = wb['Sheet1']
+    # -------------- FORMATTING & OUTPUTTING OF DATA ----------------
+    with stage('export') as record:
+        data_df = pd.DataFrame(res, columns=new_tms_header)
+        record['rows'] = len(data_df)
 
-    booking_needed_fill = PatternFill(start_color='FCE4D6', end_color='FCE4D6', fill_type='solid')
-    venue_mismatch_fill = PatternFill(start_color='FE8780', end_color='FE8780', fill_type='solid')
-    time_exceed_fill = PatternFill(start_color='BA92BE', end_color='BA92BE', fill_type='solid')
-    course_not_found_fill = PatternFill(start_color='FFD966', end_color='FFD966', fill_type='solid')
-    
+        write_frame(filename, data_df, output_header, output_columns, remark_highlights)
 
-    for row in ws.iter_rows(min_row=2, values_only=False):
-        remarks = row[5].value
-
-        if remarks == 'Venue NOT matched':
-            for cell in row:
-                cell.fill = venue_mismatch_fill
-        elif remarks == 'Timing exceeds booking':
-            for cell in row:
-                cell.fill = time_exceed_fill
-        elif remarks == 'Booking is missing for this record':
-            for cell in row:
-                cell.fill = booking_needed_fill
-        elif remarks == 'Not found in FBS List / Name mismatched':
-            for cell in row:
-                cell.fill = course_not_found_fill 
-
-    wb.save(filename)
+    if profile:
+        print(profile.summary())